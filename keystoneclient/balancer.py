@@ -0,0 +1,107 @@
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Spreading requests over several equivalent Keystone endpoints.
+"""
+
+import threading
+import time
+
+
+ROUND_ROBIN = 'round-robin'
+LEAST_OUTSTANDING = 'least-outstanding'
+
+
+class EndpointSet(object):
+    """A set of interchangeable endpoints shared by a client's requests.
+
+    Each request picks an endpoint with ``acquire()`` and reports back with
+    ``release()``. Endpoints are chosen in turn (``round-robin``) or by the
+    fewest requests in flight (``least-outstanding``). An endpoint whose
+    request failed is avoided for ``cooldown`` seconds, after which it is
+    tried again; if every endpoint is down, the one due back first is used.
+
+    :param urls: The endpoints' base URLs.
+    :param string strategy: ``round-robin`` or ``least-outstanding``.
+    :param integer cooldown: Seconds a failed endpoint is avoided for.
+    """
+
+    def __init__(self, urls, strategy=ROUND_ROBIN, cooldown=30):
+        if strategy not in (ROUND_ROBIN, LEAST_OUTSTANDING):
+            raise ValueError("Unknown strategy %r." % strategy)
+        self.urls = []
+        for url in urls:
+            url = url.rstrip('/')
+            if url not in self.urls:
+                self.urls.append(url)
+        if not self.urls:
+            raise ValueError("At least one endpoint is required.")
+        self.strategy = strategy
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._next = 0
+        self._outstanding = dict((url, 0) for url in self.urls)
+        self._down_until = dict((url, 0) for url in self.urls)
+
+    @classmethod
+    def from_catalog(cls, catalog, service_type='identity',
+                     endpoint_type='adminURL', region=None, **kwargs):
+        """Build a set from the endpoints of a service in ``catalog``, a
+        :class:`keystoneclient.service_catalog.ServiceCatalog`, optionally
+        limited to one region.
+        """
+        urls = [endpoint[endpoint_type] for endpoint
+                in catalog.get_endpoints(service_type=service_type,
+                                         endpoint_type=endpoint_type)
+                if region is None or endpoint.get('region') == region]
+        return cls(urls, **kwargs)
+
+    def __len__(self):
+        return len(self.urls)
+
+    def is_healthy(self, url):
+        return self._down_until[url] <= time.time()
+
+    def acquire(self, exclude=()):
+        """Pick an endpoint for a request, other than those in ``exclude``.
+
+        Every call must be matched by a call to ``release()``.
+        """
+        with self._lock:
+            now = time.time()
+            candidates = [url for url in self.urls if url not in exclude]
+            if not candidates:
+                raise ValueError("No endpoint left to try.")
+            healthy = [url for url in candidates
+                       if self._down_until[url] <= now]
+            if not healthy:
+                healthy = [min(candidates, key=self._down_until.get)]
+            if self.strategy == LEAST_OUTSTANDING:
+                url = min(healthy, key=self._outstanding.get)
+            else:
+                url = healthy[self._next % len(healthy)]
+                self._next += 1
+            self._outstanding[url] += 1
+            return url
+
+    def release(self, url, ok=True):
+        """Report the end of a request to ``url`` and whether it worked."""
+        with self._lock:
+            self._outstanding[url] -= 1
+            if ok:
+                self._down_until[url] = 0
+            else:
+                self._down_until[url] = time.time() + self.cooldown
@@ -18,7 +18,15 @@
 Base utilities to build API operation managers and objects on top of.
 """
 
+import copy
+import inspect
+import urllib
+import warnings
+
+from keystoneclient import cache
+from keystoneclient import concurrency
 from keystoneclient import exceptions
+from keystoneclient import jsonstream
 
 
 # Python 2.4 compat
@@ -47,48 +55,279 @@ def getid(obj):
         return obj
 
 
+class LazyLoadWarning(UserWarning):
+    """
+    Issued when a missing attribute is looked up on a resource that isn't
+    loaded, by a client created with ``lazy_loading=False``.
+    """
+
+
+def _instrumented(method, metrics, operation):
+    def wrapper(*args, **kwargs):
+        with metrics.operation(operation):
+            return method(*args, **kwargs)
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+def _may_lazy_load(resource, k):
+    """
+    Return whether ``resource`` should fetch itself to look up ``k``, and
+    report the lookup if lazy-loading is disabled for its client.
+    """
+    if resource.is_loaded():
+        return False
+    api = getattr(resource.manager, 'api', None)
+    if getattr(api, 'lazy_loading', True):
+        return True
+    warnings.warn("%s has no %r loaded and lazy-loading is disabled; "
+                  "use base.prefetch() to load it." %
+                  (resource.__class__.__name__, k),
+                  LazyLoadWarning, stacklevel=3)
+    return False
+
+
+def prefetch(resources, max_workers=10):
+    """
+    Load every resource in ``resources`` that isn't loaded yet.
+
+    This fetches up front what looking up a missing attribute on each
+    resource would have fetched one at a time. Resources with the same
+    manager and ID are fetched once, and at most ``max_workers`` requests
+    are in flight at a time. If any fetch fails, the other resources are
+    still loaded and the first error is raised afterwards.
+
+    Returns the resources as a list.
+    """
+    resources = list(resources)
+    pending = {}
+    for resource in resources:
+        if resource.is_loaded() or not hasattr(resource.manager, 'get'):
+            continue
+        key = (resource.manager, resource.id)
+        pending.setdefault(key, []).append(resource)
+    if not pending:
+        return resources
+
+    keys = pending.keys()
+    pool = concurrency.WorkerPool(max_workers=min(max_workers, len(keys)))
+    try:
+        futures = [pool.submit(manager.get, id) for manager, id in keys]
+        for key, future in zip(keys, futures):
+            if future.exception() is not None:
+                continue
+            new = future.result()
+            for resource in pending[key]:
+                resource.set_loaded(True)
+                if new:
+                    resource._add_details(new._info)
+    finally:
+        pool.shutdown()
+    concurrency.wait_all(futures)
+    return resources
+
+
 class Manager(object):
     """
     Managers interact with a particular type of API (servers, flavors, images,
     etc.) and provide CRUD operations for them.
     """
     resource_class = None
+    # Raw list responses by URL, see enable_list_cache().
+    list_cache = None
+    # Raw resources by ID, see enable_entity_cache().
+    entity_cache = None
 
     def __init__(self, api):
         self.api = api
+        if getattr(api, 'compact_resources', False) and self.resource_class:
+            self.resource_class = compact_class(self.resource_class)
+        if getattr(api, 'metrics', None) is not None:
+            self._instrument(api.metrics)
+
+    def _instrument(self, metrics):
+        """
+        Attribute the requests made by each public method to it in
+        ``metrics``.
+        """
+        for name in dir(self):
+            if name.startswith('_'):
+                continue
+            method = getattr(self, name)
+            if not inspect.ismethod(method):
+                continue
+            setattr(self, name, _instrumented(
+                method, metrics, "%s.%s" % (self.__class__.__name__, name)))
+
+    def enable_list_cache(self, ttl=300, max_size=100):
+        """
+        Serve ``list()`` calls from memory for ``ttl`` seconds.
+
+        Meant for collections that rarely change. The cache holds at most
+        ``max_size`` lists; a list is dropped whenever this manager creates,
+        updates or deletes a resource of its collection, and changes made by
+        anyone else show up once the cached lists expire.
+        """
+        self.list_cache = cache.LRUCache(max_size=max_size, ttl=ttl)
+
+    def _invalidate_lists(self, url):
+        """
+        Drop the cached lists of the collection ``url`` belongs to, such as
+        ``/OS-KSADM/roles`` for ``/OS-KSADM/roles/3``.
+        """
+        if self.list_cache is None:
+            return
+        path = url.split('?')[0]
+        for key, data in self.list_cache.items():
+            collection = key.split('?')[0]
+            if path == collection or path.startswith(collection + '/'):
+                self.list_cache.delete(key)
+
+    def enable_entity_cache(self, ttl=60, max_size=1000):
+        """
+        Serve ``get()`` calls for recently seen IDs from memory.
+
+        Resources returned by ``get()`` and ``list()`` are kept for ``ttl``
+        seconds, at most ``max_size`` of them. Changes made through this
+        manager drop the affected resource; changes made by anyone else
+        show up once it expires.
+        """
+        self.entity_cache = cache.LRUCache(max_size=max_size, ttl=ttl)
+
+    def _remember_entities(self, infos):
+        if self.entity_cache is not None:
+            for info in infos:
+                if 'id' in info:
+                    self.entity_cache.set(str(info['id']),
+                                          copy.deepcopy(info))
+
+    def _forget_entity(self, entity_id):
+        if self.entity_cache is not None:
+            self.entity_cache.delete(str(entity_id))
+
+    def _list(self, url, response_key, obj_class=None, body=None,
+              stream=False, use_cache=False):
+        """
+        Fetch a list of resources.
+
+        With ``stream``, the response is decoded incrementally and an
+        iterator is returned that builds each resource as its element of
+        the list is decoded, instead of a fully materialized list. With
+        ``use_cache``, the list may be served from the list cache, which
+        only a manager's own ``list()`` should ask for.
+        """
+        if obj_class is None:
+            obj_class = self.resource_class
+
+        cacheable = (use_cache and self.list_cache is not None and
+                     not (body or stream))
+        if cacheable:
+            data = self.list_cache.get(url)
+            if data is not None:
+                return [obj_class(self, res, loaded=True)
+                        for res in copy.deepcopy(data)]
 
-    def _list(self, url, response_key, obj_class=None, body=None):
         resp = None
+        kwargs = {}
+        if stream:
+            kwargs['stream'] = True
         if body:
-            resp, body = self.api.post(url, body=body)
+            resp, body = self.api.post(url, body=body, **kwargs)
         else:
-            resp, body = self.api.get(url)
+            resp, body = self.api.get(url, **kwargs)
 
-        if obj_class is None:
-            obj_class = self.resource_class
+        if stream:
+            return (obj_class(self, res, loaded=True)
+                    for res in jsonstream.iter_list(body, response_key)
+                    if res)
 
         data = body[response_key]
         # NOTE(ja): keystone returns values as list as {'values': [ ... ]}
         #           unlike other services which just return the list...
         if type(data) is dict:
             data = data['values']
-        return [obj_class(self, res, loaded=True) for res in data if res]
-
-    def _get(self, url, response_key):
+        data = [res for res in data if res]
+        self._remember_entities(data)
+        if cacheable:
+            self.list_cache.set(url, data)
+            data = copy.deepcopy(data)
+        return [obj_class(self, res, loaded=True) for res in data]
+
+    def _iter_pages(self, list_page, page_size, prefetch=False):
+        """
+        Iterate over a paginated collection, fetching one page at a time.
+
+        ``list_page(limit, marker)`` is called to fetch each page, with the
+        ID of the last resource seen as the marker. Iteration stops at the
+        first page holding fewer than ``page_size`` resources, so at most
+        two pages are held in memory at once. With ``prefetch``, the next
+        page is requested in the background while the current one is being
+        consumed.
+        """
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1.")
+        pool = None
+        if prefetch:
+            pool = concurrency.WorkerPool(max_workers=1)
+        try:
+            marker = None
+            next_page = None
+            seen = set()
+            while True:
+                if next_page is not None:
+                    page = next_page.result()
+                else:
+                    page = list_page(page_size, marker)
+                next_page = None
+
+                # A page that isn't full, or a server ignoring the limit or
+                # the marker (sending back resources already yielded),
+                # means there's nothing left to fetch.
+                fresh = [resource for resource in page
+                         if resource.id not in seen]
+                if len(page) != page_size or len(fresh) != len(page):
+                    for resource in fresh:
+                        yield resource
+                    return
+
+                marker = page[-1].id
+                seen = set(resource.id for resource in page)
+                if pool is not None:
+                    next_page = pool.submit(list_page, page_size, marker)
+                for resource in page:
+                    yield resource
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def _get(self, url, response_key, entity_id=None):
+        """
+        Fetch a resource, or with ``entity_id`` given, take it from the
+        entity cache if it is there.
+        """
+        if entity_id is not None and self.entity_cache is not None:
+            info = self.entity_cache.get(str(entity_id))
+            if info is not None:
+                return self.resource_class(self, copy.deepcopy(info))
         resp, body = self.api.get(url)
+        self._remember_entities([body[response_key]])
         return self.resource_class(self, body[response_key])
 
     def _create(self, url, body, response_key, return_raw=False):
         resp, body = self.api.post(url, body=body)
+        self._invalidate_lists(url)
         if return_raw:
             return body[response_key]
         return self.resource_class(self, body[response_key])
 
     def _delete(self, url):
         resp, body = self.api.delete(url)
+        self._invalidate_lists(url)
 
     def _update(self, url, body, response_key=None):
         resp, body = self.api.put(url, body=body)
+        self._invalidate_lists(url)
         # PUT requests may not return a body
         if body:
             return self.resource_class(self, body[response_key])
@@ -97,40 +336,89 @@ class Manager(object):
 class ManagerWithFind(Manager):
     """
     Like a `Manager`, but with additional `find()`/`findall()` methods.
+
+    Subclasses list the attributes the server can filter on in
+    ``query_attrs`` and implement ``_query()`` to fetch only the matching
+    resources; other attributes are matched on the Python side.
     """
-    def find(self, **kwargs):
-        """
-        Find a single item with attributes matching ``**kwargs``.
+    query_attrs = ()
 
-        This isn't very efficient: it loads the entire list then filters on
-        the Python side.
+    def _query(self, **filters):
         """
-        rl = self.findall(**kwargs)
-        try:
-            return rl[0]
-        except IndexError:
-            msg = "No %s matching %s." % (self.resource_class.__name__, kwargs)
-            raise exceptions.NotFound(404, msg)
+        Return resources matching ``filters`` (a subset of ``query_attrs``),
+        as narrowed down by the server.
+        """
+        raise NotImplementedError
 
-    def findall(self, **kwargs):
+    def _query_get(self, url, filters, response_key, list_key):
         """
-        Find all items with attributes matching ``**kwargs``.
+        Helper for ``_query()`` implementations.
 
-        This isn't very efficient: it loads the entire list then filters on
-        the Python side.
+        Keystone answers a filtered GET with the single matching resource
+        under ``response_key``, or a 404 if there is none. A server which
+        doesn't support the filter returns the whole collection under
+        ``list_key`` instead, which ``findall()`` then filters itself.
         """
-        found = []
-        searches = kwargs.items()
+        params = []
+        for key, value in sorted(filters.items()):
+            if isinstance(value, unicode):
+                value = value.encode('utf-8')
+            params.append((key, value))
+        query = urllib.urlencode(params)
+        try:
+            resp, body = self.api.get("%s?%s" % (url, query))
+        except exceptions.NotFound:
+            return []
+
+        if response_key in body:
+            data = [body[response_key]]
+        else:
+            data = body[list_key]
+            if type(data) is dict:
+                data = data['values']
+        return [self.resource_class(self, res, loaded=True)
+                for res in data if res]
+
+    def _iter_matches(self, kwargs):
+        filters = dict((attr, value) for (attr, value) in kwargs.items()
+                       if attr in self.query_attrs)
+        if filters:
+            candidates = self._query(**filters)
+        else:
+            candidates = self.list()
 
-        for obj in self.list():
+        # Server-side filters are checked again in case they were ignored.
+        searches = kwargs.items()
+        for obj in candidates:
             try:
                 if all(getattr(obj, attr) == value
                                     for (attr, value) in searches):
-                    found.append(obj)
+                    yield obj
             except AttributeError:
                 continue
 
-        return found
+    def find(self, **kwargs):
+        """
+        Find a single item with attributes matching ``**kwargs``.
+
+        Attributes in ``query_attrs`` are filtered on by the server; if
+        none are given, this loads the entire list and filters on the
+        Python side, stopping at the first match.
+        """
+        for obj in self._iter_matches(kwargs):
+            return obj
+        msg = "No %s matching %s." % (self.resource_class.__name__, kwargs)
+        raise exceptions.NotFound(404, msg)
+
+    def findall(self, **kwargs):
+        """
+        Find all items with attributes matching ``**kwargs``.
+
+        Attributes in ``query_attrs`` are filtered on by the server; if
+        none are given, this loads the entire list and filters on the
+        Python side.
+        """
+        return list(self._iter_matches(kwargs))
 
 
 class Resource(object):
@@ -141,7 +429,12 @@ class Resource(object):
     :param manager: Manager object
     :param info: dictionary representing resource attributes
     :param loaded: prevent lazy-loading if set to True
+
+    Subclasses may name the attributes they usually carry in
+    ``compact_fields``, which :func:`compact_class` turns into slots.
     """
+    compact_fields = ()
+
     def __init__(self, manager, info, loaded=False):
         self.manager = manager
         self._info = info
@@ -155,7 +448,7 @@ class Resource(object):
     def __getattr__(self, k):
         if k not in self.__dict__:
             #NOTE(bcwaldon): disallow lazy-loading if already loaded once
-            if not self.is_loaded():
+            if _may_lazy_load(self, k):
                 self.get()
                 return self.__getattr__(k)
 
@@ -191,3 +484,117 @@ class Resource(object):
 
     def set_loaded(self, val):
         self._loaded = val
+
+
+class CompactResource(object):
+    """
+    A memory-compact counterpart of :class:`Resource`.
+
+    Each attribute is stored once: fields named in the resource class's
+    ``compact_fields`` live in slots, anything else in a single overflow
+    dict, and there is no per-instance ``__dict__``. ``_info`` is rebuilt
+    from those on access. Use :func:`compact_class` to derive one from a
+    :class:`Resource` subclass.
+    """
+    __slots__ = ('manager', '_loaded', '_extra')
+    _fields = ()
+
+    def __init__(self, manager, info, loaded=False):
+        self.manager = manager
+        self._extra = None
+        self._add_details(info)
+        self._loaded = loaded
+
+    def __setattr__(self, k, v):
+        try:
+            object.__setattr__(self, k, v)
+        except AttributeError:
+            if self._extra is None:
+                object.__setattr__(self, '_extra', {})
+            self._extra[k] = v
+
+    def __getattr__(self, k):
+        # Only reached for unset slots and names held in the overflow dict.
+        if k in CompactResource.__slots__ or k.startswith('__'):
+            raise AttributeError(k)
+        extra = self._extra
+        if extra is not None and k in extra:
+            return extra[k]
+        #NOTE(bcwaldon): disallow lazy-loading if already loaded once
+        if _may_lazy_load(self, k):
+            self.get()
+            return getattr(self, k)
+        raise AttributeError(k)
+
+    @property
+    def _info(self):
+        info = {}
+        for k in self._fields:
+            try:
+                info[k] = object.__getattribute__(self, k)
+            except AttributeError:
+                continue
+        if self._extra:
+            info.update(self._extra)
+        return info
+
+    def _add_details(self, info):
+        for (k, v) in info.iteritems():
+            setattr(self, k, v)
+
+    def __repr__(self):
+        info = self._info
+        reprkeys = sorted(k for k in info if k[0] != '_')
+        info = ", ".join("%s=%s" % (k, info[k]) for k in reprkeys)
+        return "<%s %s>" % (self.__class__.__name__, info)
+
+    def get(self):
+        # set_loaded() first ... so if we have to bail, we know we tried.
+        self.set_loaded(True)
+        if not hasattr(self.manager, 'get'):
+            return
+
+        new = self.manager.get(self.id)
+        if new:
+            self._add_details(new._info)
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        if hasattr(self, 'id') and hasattr(other, 'id'):
+            return self.id == other.id
+        return self._info == other._info
+
+    def is_loaded(self):
+        return self._loaded
+
+    def set_loaded(self, val):
+        self._loaded = val
+
+
+_compact_classes = {}
+
+
+def compact_class(resource_class):
+    """
+    Return a :class:`CompactResource` subclass standing in for
+    ``resource_class``.
+
+    It has the same name and the methods and properties defined on
+    ``resource_class`` itself, and a slot for each of its
+    ``compact_fields``. Instances are not instances of ``resource_class``.
+    """
+    try:
+        return _compact_classes[resource_class]
+    except KeyError:
+        pass
+
+    namespace = dict((k, v) for (k, v) in resource_class.__dict__.items()
+                     if k not in ('__dict__', '__weakref__'))
+    fields = tuple(f for f in getattr(resource_class, 'compact_fields', ())
+                   if f not in namespace)
+    namespace['__slots__'] = fields
+    namespace['_fields'] = fields
+    cls = type(resource_class.__name__, (CompactResource,), namespace)
+    _compact_classes[resource_class] = cls
+    return cls
@@ -0,0 +1,487 @@
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Caches used to avoid repeating requests against the Keystone API.
+"""
+
+import binascii
+import errno
+import hashlib
+import hmac
+import os
+import tempfile
+import threading
+import time
+import urlparse
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+from keystoneclient import utils
+
+
+_marker = object()
+
+
+class LRUCache(object):
+    """A thread-safe, size-bounded, least-recently-used cache.
+
+    Entries may optionally expire: ``ttl`` sets the default lifetime in
+    seconds for every entry and can be overridden per call to ``set()``.
+    Expired entries are dropped the next time they are looked up.
+
+    :param integer max_size: Maximum number of entries to keep.
+    :param float ttl: Default lifetime of an entry in seconds. (optional)
+    """
+
+    def __init__(self, max_size=1000, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            # key -> [prev, next, key, value, expires]
+            self._map = {}
+            self._root = root = []
+            root[:] = [root, root, None, None, None]
+
+    def __len__(self):
+        return len(self._map)
+
+    def __contains__(self, key):
+        return self.get(key, _marker) is not _marker
+
+    def _unlink(self, link):
+        link_prev, link_next = link[0], link[1]
+        link_prev[1] = link_next
+        link_next[0] = link_prev
+
+    def _append(self, link):
+        root = self._root
+        last = root[0]
+        link[0], link[1] = last, root
+        last[1] = root[0] = link
+
+    def get(self, key, default=None):
+        with self._lock:
+            link = self._map.get(key)
+            if link is None:
+                return default
+            expires = link[4]
+            if expires is not None and expires <= time.time():
+                self._unlink(link)
+                del self._map[key]
+                return default
+            self._unlink(link)
+            self._append(link)
+            return link[3]
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        expires = None
+        if ttl is not None:
+            expires = time.time() + ttl
+        with self._lock:
+            link = self._map.get(key)
+            if link is not None:
+                self._unlink(link)
+            link = [None, None, key, value, expires]
+            self._append(link)
+            self._map[key] = link
+            while len(self._map) > self.max_size:
+                oldest = self._root[1]
+                self._unlink(oldest)
+                del self._map[oldest[2]]
+
+    def delete(self, key):
+        with self._lock:
+            link = self._map.pop(key, None)
+            if link is not None:
+                self._unlink(link)
+
+    def items(self):
+        """Return ``(key, value)`` pairs, least recently used first."""
+        with self._lock:
+            now = time.time()
+            result = []
+            link = self._root[1]
+            while link is not self._root:
+                if link[4] is None or link[4] > now:
+                    result.append((link[2], link[3]))
+                link = link[1]
+            return result
+
+
+def token_key(secret, auth_url, username=None, tenant_id=None,
+              tenant_name=None, password=None, token=None):
+    """Build the key a token is cached under.
+
+    The credentials are part of the key so that a token is only handed back
+    to a caller able to obtain it themselves. They are combined in an HMAC
+    keyed with ``secret`` rather than a plain hash, so that someone reading
+    the keys can't recover a password by trying candidates against them.
+    """
+    parts = [auth_url, username, tenant_id, tenant_name, password, token]
+    raw = '\0'.join(part is not None and unicode(part) or '' for part in parts)
+    return hmac.new(secret, raw.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def _new_secret():
+    return binascii.hexlify(os.urandom(32))
+
+
+class TokenCache(object):
+    """Interface for caches of authentication responses.
+
+    A token cache stores the raw ``access`` body returned by ``POST /tokens``
+    (token plus service catalog) under a key built by ``key()``, and only
+    hands it back while the token has at least ``refresh_margin`` seconds
+    left before it expires.
+
+    :param integer refresh_margin: Seconds before a token's expiry at which
+                                   it stops being reused.
+    """
+
+    def __init__(self, refresh_margin=60):
+        self.refresh_margin = refresh_margin
+        self._secret = None
+
+    def key(self, auth_url, **credentials):
+        """Return the key for a token obtained from ``auth_url`` with
+        ``credentials`` (see :func:`token_key`).
+        """
+        if self._secret is None:
+            self._secret = self._load_secret()
+        return token_key(self._secret, auth_url, **credentials)
+
+    def _load_secret(self):
+        """Return the secret keys are built with.
+
+        Keys only need to match within one process unless the cache is
+        shared between processes, so by default the secret is random.
+        """
+        return _new_secret()
+
+    def get(self, key):
+        """Return the cached access info for ``key``, or ``None``."""
+        raise NotImplementedError
+
+    def set(self, key, access):
+        """Store access info for ``key``."""
+        raise NotImplementedError
+
+    def invalidate(self, token_id):
+        """Forget any entry holding the token ``token_id``."""
+        raise NotImplementedError
+
+    def _lifetime(self, access):
+        """Return how many seconds ``access`` may still be reused for.
+
+        Tokens with a missing or unparseable expiry are never reused.
+        """
+        try:
+            expires = utils.parse_isotime(access['token']['expires'])
+        except (KeyError, TypeError, ValueError):
+            return 0
+        return expires - self.refresh_margin - time.time()
+
+
+class MemoryTokenCache(TokenCache):
+    """An in-process, least-recently-used token cache.
+
+    Share one instance between clients to let them reuse each other's
+    tokens::
+
+        >>> token_cache = cache.MemoryTokenCache()
+        >>> keystone = client.Client(username=USER, password=PASS,
+                                     tenant_name=TENANT_NAME,
+                                     auth_url=KEYSTONE_URL,
+                                     token_cache=token_cache)
+
+    :param integer max_size: Maximum number of tokens to keep.
+    :param integer refresh_margin: Seconds before a token's expiry at which
+                                   it stops being reused.
+    """
+
+    def __init__(self, max_size=100, refresh_margin=60):
+        super(MemoryTokenCache, self).__init__(refresh_margin=refresh_margin)
+        self._cache = LRUCache(max_size=max_size)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, access):
+        lifetime = self._lifetime(access)
+        if lifetime > 0:
+            self._cache.set(key, access, ttl=lifetime)
+
+    def invalidate(self, token_id):
+        for key, access in self._cache.items():
+            if access['token'].get('id') == token_id:
+                self._cache.delete(key)
+
+
+class FileTokenCache(TokenCache):
+    """A token cache kept in a file so it can be shared between processes.
+
+    Entries are stored as JSON and the file is locked while it is read or
+    rewritten (on platforms providing ``fcntl``). Expired entries are pruned
+    whenever a new token is stored. The file and its directory are created
+    readable by the current user only, since they hold bearer tokens; so is
+    the ``.key`` file next to it holding the secret entries are keyed with.
+
+    :param string path: Location of the cache file. Defaults to
+                        ``~/.keystoneclient/token-cache``.
+    :param integer refresh_margin: Seconds before a token's expiry at which
+                                   it stops being reused.
+    """
+
+    def __init__(self, path=None, refresh_margin=60):
+        super(FileTokenCache, self).__init__(refresh_margin=refresh_margin)
+        self.path = path or os.path.expanduser('~/.keystoneclient/'
+                                               'token-cache')
+
+    def _make_directory(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            try:
+                os.makedirs(directory, 0700)
+            except OSError, e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+    def _load_secret(self):
+        path = self.path + '.key'
+        try:
+            self._make_directory()
+            if not os.path.exists(path):
+                # Write the secret aside and link it into place, so that
+                # processes racing to create it all end up reading the
+                # same complete one.
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.')
+                try:
+                    os.write(fd, _new_secret())
+                    os.close(fd)
+                    try:
+                        getattr(os, 'link', os.rename)(tmp, path)
+                    except OSError, e:
+                        if e.errno != errno.EEXIST:
+                            raise
+                finally:
+                    if os.path.exists(tmp):
+                        os.unlink(tmp)
+            f = open(path)
+            try:
+                secret = f.read()
+            finally:
+                f.close()
+        except (IOError, OSError):
+            secret = None
+        # Without a secret on disk, keys hold for this process only.
+        return secret or _new_secret()
+
+    def _open(self, mode):
+        self._make_directory()
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0600)
+        f = os.fdopen(fd, 'r+')
+        if fcntl is not None:
+            fcntl.flock(f, mode == 'w' and fcntl.LOCK_EX or fcntl.LOCK_SH)
+        return f
+
+    def _read(self, f):
+        f.seek(0)
+        try:
+            entries = json.loads(f.read() or '{}')
+        except ValueError:
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        return entries
+
+    def _write(self, f, entries):
+        f.seek(0)
+        f.truncate()
+        f.write(json.dumps(entries))
+        f.flush()
+
+    def get(self, key):
+        try:
+            f = self._open('r')
+        except (IOError, OSError):
+            return None
+        try:
+            access = self._read(f).get(key)
+        finally:
+            f.close()
+        if access is not None and self._lifetime(access) > 0:
+            return access
+
+    def _update(self, func):
+        try:
+            f = self._open('w')
+        except (IOError, OSError):
+            return
+        try:
+            entries = self._read(f)
+            func(entries)
+            for key, access in entries.items():
+                if self._lifetime(access) <= 0:
+                    del entries[key]
+            self._write(f, entries)
+        finally:
+            f.close()
+
+    def set(self, key, access):
+        def _set(entries):
+            entries[key] = access
+        if self._lifetime(access) > 0:
+            self._update(_set)
+
+    def invalidate(self, token_id):
+        def _invalidate(entries):
+            for key, access in entries.items():
+                if access.get('token', {}).get('id') == token_id:
+                    del entries[key]
+        self._update(_invalidate)
+
+
+class CachedResponse(object):
+    """A GET response held by a :class:`ResponseCache`.
+
+    :param response: The ``httplib2.Response`` holding status and headers.
+    :param string body: The raw response body.
+    :param float expires: Time until which the response may be reused
+                          without asking the server, or ``None``.
+    """
+
+    def __init__(self, response, body, expires=None):
+        self.response = response
+        self.body = body
+        self.expires = expires
+
+    def is_fresh(self):
+        return self.expires is not None and self.expires > time.time()
+
+    def validators(self):
+        """Return the headers making a request conditional on this one."""
+        headers = {}
+        if 'etag' in self.response:
+            headers['If-None-Match'] = self.response['etag']
+        if 'last-modified' in self.response:
+            headers['If-Modified-Since'] = self.response['last-modified']
+        return headers
+
+
+def _cache_control(response):
+    directives = {}
+    for part in response.get('cache-control', '').split(','):
+        name, sep, value = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+
+class ResponseCache(object):
+    """A per-client cache of GET responses honoring HTTP caching headers.
+
+    Only successful responses carrying a validator (``ETag`` or
+    ``Last-Modified``) or a ``Cache-Control: max-age`` are kept, and never
+    those marked ``no-store``. While within its ``max-age`` a response is
+    reused as is; afterwards (or immediately, with ``no-cache``) it is
+    revalidated with a conditional request, and a ``304 Not Modified``
+    answer reuses the stored body.
+
+    Entries are keyed on the URL and the token the request was made with,
+    so a response is only reused for the credentials that fetched it.
+
+    :param integer max_size: Maximum number of responses to keep.
+    """
+
+    # Headers describing the stored body, not to be replaced by a 304's.
+    ENTITY_HEADERS = ('status', 'content-length', 'content-location',
+                      'content-encoding', 'transfer-encoding')
+
+    def __init__(self, max_size=100):
+        self._cache = LRUCache(max_size=max_size)
+
+    def get(self, key):
+        """Return the :class:`CachedResponse` stored for ``key``, or
+        ``None``.
+        """
+        return self._cache.get(key)
+
+    def _expires(self, response):
+        directives = _cache_control(response)
+        if 'no-cache' in directives:
+            return None
+        try:
+            max_age = int(directives['max-age'])
+        except (KeyError, ValueError):
+            return None
+        return time.time() + max_age
+
+    def store(self, key, response, body):
+        """Keep a successful response if its headers allow reusing it."""
+        directives = _cache_control(response)
+        if response.status != 200 or 'no-store' in directives:
+            return
+        entry = CachedResponse(response, body, self._expires(response))
+        if entry.expires is None and not entry.validators():
+            return
+        self._cache.set(key, entry)
+
+    def revalidate(self, key, entry, response):
+        """Record that the server answered ``304`` for ``entry``.
+
+        Returns the refreshed entry, whose headers are updated from the
+        ``304`` response.
+        """
+        headers = dict(entry.response)
+        for name, value in response.items():
+            if name not in self.ENTITY_HEADERS:
+                headers[name] = value
+        refreshed = type(entry.response)(headers)
+        refreshed.status = entry.response.status
+        refreshed.reason = entry.response.reason
+        entry = CachedResponse(refreshed, entry.body,
+                               self._expires(refreshed))
+        self._cache.set(key, entry)
+        return entry
+
+    def invalidate(self, url):
+        """Forget responses made stale by a change to ``url``.
+
+        This drops the entries for ``url`` itself and for every collection
+        containing it, e.g. ``/tenants`` when ``/tenants/1`` was updated.
+        """
+        path = urlparse.urlsplit(url)[2].rstrip('/')
+        for key, entry in self._cache.items():
+            cached_path = urlparse.urlsplit(key[0])[2].rstrip('/')
+            if path == cached_path or path.startswith(cached_path + '/'):
+                self._cache.delete(key)
+
+    def clear(self):
+        self._cache.clear()
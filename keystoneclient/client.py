@@ -9,8 +9,13 @@ OpenStack Client interface. Handles the REST calls and responses.
 """
 
 import copy
+import httplib
 import logging
 import os
+import select
+import socket
+import sys
+import threading
 import time
 import urllib
 import urlparse
@@ -28,19 +33,180 @@ if not hasattr(urlparse, 'parse_qsl'):
     urlparse.parse_qsl = cgi.parse_qsl
 
 
+from keystoneclient import balancer
+from keystoneclient import cache
+from keystoneclient import concurrency
 from keystoneclient import exceptions
+from keystoneclient import retry
+from keystoneclient import tracing
 
 
 _logger = logging.getLogger(__name__)
 
 
+class ConnectionPool(object):
+    """ A thread-safe pool of HTTP connections shared between clients.
+
+    Idle ``httplib2.Http`` objects, each holding its open keep-alive
+    connections, are kept per host so that a new client (or a new request
+    from another thread) can reuse an established TCP/TLS session instead
+    of opening its own. At most ``max_idle_per_host`` idle objects are kept
+    for each host; objects idle for longer than ``idle_timeout`` seconds,
+    and connections the server has closed, are discarded rather than
+    reused. Only idle objects are capped: as many connections as there are
+    concurrent requests may be open at once.
+
+    :param integer max_idle_per_host: Idle connections to keep per host.
+    :param integer idle_timeout: Seconds an idle connection is kept for.
+    """
+
+    # Per-client state and settings applied to a pooled object before each
+    # use, so that nothing carries over from the client that used it last.
+    # The authorizations httplib2 derives from credentials are kept in the
+    # client's own list.
+    SETTINGS = ('credentials', 'certificates', 'authorizations', 'cache',
+                'follow_redirects', 'follow_all_redirects',
+                'force_exception_to_status_code', 'ignore_etag',
+                'optimistic_concurrency_methods',
+                'forward_authorization_headers', 'redirect_codes',
+                'safe_methods')
+
+    def __init__(self, max_idle_per_host=10, idle_timeout=60):
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle = {}
+
+    def _key(self, url, client):
+        scheme, netloc = urlparse.urlsplit(url)[:2]
+        return (scheme, netloc, client.timeout,
+                getattr(client, 'ca_certs', None),
+                getattr(client, 'disable_ssl_certificate_validation', False))
+
+    def get(self, url, client):
+        """ Check out an ``httplib2.Http`` configured like ``client``. """
+        key = self._key(url, client)
+        http = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle and http is None:
+                http, last_used = idle.pop()
+                if time.time() - last_used > self.idle_timeout:
+                    self._close(http)
+                    http = None
+        if http is None:
+            http = httplib2.Http(timeout=client.timeout,
+                                 ca_certs=key[3],
+                                 disable_ssl_certificate_validation=key[4])
+        else:
+            self._check_connections(http)
+        for attr in self.SETTINGS:
+            # Not every httplib2 version has all of them.
+            if hasattr(client, attr):
+                setattr(http, attr, getattr(client, attr))
+        return http
+
+    def put(self, url, http, client):
+        """ Return an object obtained from ``get()`` to the pool. """
+        key = self._key(url, client)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append((http, time.time()))
+                return
+        self._close(http)
+
+    def clear(self):
+        """ Close every idle connection. """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for entries in idle.values():
+            for http, last_used in entries:
+                self._close(http)
+
+    @staticmethod
+    def _check_connections(http):
+        """ Drop connections the server has closed while they sat idle.
+
+        An idle keep-alive socket only becomes readable when the server
+        closes it (or sends something unexpected), either way it can't be
+        reused.
+        """
+        for key, conn in http.connections.items():
+            sock = getattr(conn, 'sock', None)
+            if sock is None:
+                continue
+            try:
+                readable = select.select([sock], [], [], 0)[0]
+            except (select.error, ValueError, TypeError):
+                readable = True
+            if readable:
+                conn.close()
+                del http.connections[key]
+
+    @staticmethod
+    def _close(http):
+        for conn in http.connections.values():
+            conn.close()
+        http.connections.clear()
+
+
+_connection_pool = ConnectionPool()
+
+
 class HTTPClient(httplib2.Http):
+    """ Base class for clients of the Keystone API.
+
+    A client may be shared by several threads: connections are drawn from a
+    thread-safe pool per request, and authentication is serialized so that
+    concurrent requests rejected with a 401 trigger a single
+    re-authentication.
+
+    GET responses are kept in a per-client
+    :class:`keystoneclient.cache.ResponseCache` and reused or revalidated
+    according to their ``ETag``, ``Last-Modified`` and ``Cache-Control``
+    headers. Pass ``response_cache=False`` to disable this, or
+    ``cache_busting=True`` to instead add a unique ``fresh`` parameter to
+    every GET for servers that cache too aggressively.
+
+    Given ``endpoints`` (a :class:`keystoneclient.balancer.EndpointSet` or
+    a list of URLs), API requests are spread over those endpoints instead
+    of going to ``management_url``, and a request failing to connect is
+    retried on another endpoint.
+
+    Given a ``retry_policy`` (a :class:`keystoneclient.retry.RetryPolicy`),
+    API requests failing for transient reasons are retried; a policy can
+    also be passed to a single call as ``retry_policy``. Given a
+    ``rate_limiter`` (a :class:`keystoneclient.ratelimit.RequestRateLimiter`),
+    requests are throttled before they are sent.
+
+    Identical GETs made at the same time by several threads are coalesced:
+    one request is sent and every caller gets its result. Pass
+    ``coalesce_requests=False`` to send them all.
+
+    Given ``metrics`` (a :class:`keystoneclient.metrics.Metrics`), the
+    latency, status and size of every request sent are recorded. Given a
+    ``tracer`` (a :class:`keystoneclient.tracing.Tracer`), an event is
+    emitted for each request sent; without one, requests are traced to the
+    ``keystoneclient.client`` logger while it is at debug level, which
+    setting ``KEYSTONECLIENT_DEBUG`` in the environment does. With either
+    ``endpoints`` or a client-wide ``retry_policy``, connection errors are
+    raised as such rather than turned into a ``BadRequest``.
+    """
 
     USER_AGENT = 'python-keystoneclient'
+    CONNECTION_ERRORS = retry.CONNECTION_ERRORS
+    IDEMPOTENT_METHODS = retry.IDEMPOTENT_METHODS
+    RENEWAL_RETRY_INTERVAL = 30
+    PROBE_TIMEOUT = 5
 
     def __init__(self, username=None, tenant_id=None, tenant_name=None,
                  password=None, auth_url=None, region_name=None, timeout=None,
-                 endpoint=None, token=None):
+                 endpoint=None, token=None, token_cache=None,
+                 renew_margin=None, connection_pool=None,
+                 response_cache=None, cache_busting=False, endpoints=None,
+                 retry_policy=None, rate_limiter=None,
+                 coalesce_requests=True, metrics=None, tracer=None):
         super(HTTPClient, self).__init__(timeout=timeout)
         self.username = username
         self.tenant_id = tenant_id
@@ -52,6 +218,33 @@ class HTTPClient(httplib2.Http):
         self.auth_token = token
 
         self.management_url = endpoint
+        self.token_cache = token_cache
+        self.renew_margin = renew_margin
+        self._renewal_timer = None
+        # Expiry of the token being renewed, while a renewal is under way.
+        self._renewing_expires = None
+        self.connection_pool = connection_pool or _connection_pool
+        self.cache_busting = cache_busting
+        if response_cache is None and not cache_busting:
+            response_cache = cache.ResponseCache()
+        self.response_cache = response_cache or None
+        if endpoints is not None and not isinstance(endpoints,
+                                                    balancer.EndpointSet):
+            endpoints = balancer.EndpointSet(endpoints)
+        self.endpoints = endpoints
+        if endpoints is not None and not self.management_url:
+            self.management_url = endpoints.urls[0]
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.coalesce_requests = coalesce_requests
+        self.metrics = metrics
+        self.tracer = tracer
+        if os.environ.get('KEYSTONECLIENT_DEBUG', False):
+            tracing.enable_debug_logging()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        # Serializes (re-)authentication between threads sharing a client.
+        self._auth_lock = threading.RLock()
 
         # httplib2 overrides
         self.force_exception_to_status_code = True
@@ -72,60 +265,231 @@ class HTTPClient(httplib2.Http):
         """
         raise NotImplementedError
 
-    def http_log(self, args, kwargs, resp, body):
-        if os.environ.get('KEYSTONECLIENT_DEBUG', False):
-            ch = logging.StreamHandler()
-            _logger.setLevel(logging.DEBUG)
-            _logger.addHandler(ch)
-        elif not _logger.isEnabledFor(logging.DEBUG):
+    def _schedule_token_renewal(self, expires):
+        """ Arrange for the token to be renewed before it expires.
+
+        Does nothing unless the client was created with a ``renew_margin``.
+        Renewal happens on a daemon thread that calls ``authenticate()``,
+        so requests keep using the current token meanwhile instead of
+        waiting for a 401 to re-authenticate.
+        """
+        if self.renew_margin is None or expires is None:
+            return
+        renewing = self._renewing_expires
+        if renewing is not None and expires <= renewing:
+            # The renewal handed back a token expiring no later than the one
+            # it replaces (e.g. the server re-issued it): renewing again now
+            # would just spin, so wait before trying again.
+            self._retry_token_renewal(renewing)
             return
+        delay = max(expires - self.renew_margin - time.time(), 0)
+        self._start_renewal_timer(delay, expires)
+
+    def _start_renewal_timer(self, delay, expires):
+        self.stop_token_renewal()
+        timer = threading.Timer(delay, self._renew_token, args=(expires,))
+        timer.setDaemon(True)
+        self._renewal_timer = timer
+        timer.start()
+
+    def _retry_token_renewal(self, expires):
+        # Keep trying while the current token is still good; once it
+        # expires the next request re-authenticates after its 401.
+        if time.time() + self.RENEWAL_RETRY_INTERVAL < expires:
+            self._start_renewal_timer(self.RENEWAL_RETRY_INTERVAL, expires)
+
+    def _renew_token(self, expires):
+        try:
+            with self._auth_lock:
+                self._renewing_expires = expires
+                try:
+                    # Don't let the cache hand back the token being renewed.
+                    if self.token_cache is not None and self.auth_token:
+                        self.token_cache.invalidate(self.auth_token)
+                    self.authenticate()
+                finally:
+                    self._renewing_expires = None
+        except Exception:
+            _logger.exception("Unable to renew token.")
+            self._retry_token_renewal(expires)
+
+    def stop_token_renewal(self):
+        """ Cancel any pending background token renewal. """
+        timer = self._renewal_timer
+        self._renewal_timer = None
+        if timer is not None:
+            timer.cancel()
+
+    def probe_endpoints(self, urls, max_workers=10, timeout=None):
+        """ Measure the round-trip time to each of ``urls`` concurrently.
+
+        Each URL is fetched with an unauthenticated GET, at most
+        ``max_workers`` at a time, and counts as healthy if it answers with
+        a status below 400 within ``timeout`` seconds (``PROBE_TIMEOUT`` by
+        default, whatever the client's own timeout).
+
+        Returns ``(url, seconds)`` tuples for the healthy endpoints, fastest
+        first.
+        """
+        if timeout is None:
+            timeout = self.PROBE_TIMEOUT
 
-        string_parts = ['curl -i']
-        for element in args:
-            if element in ('GET', 'POST'):
-                string_parts.append(' -X %s' % element)
-            else:
-                string_parts.append(' %s' % element)
+        def probe(url):
+            start = time.time()
+            try:
+                resp, body = self._probe_request(url, timeout)
+            except Exception:
+                _logger.debug("Probing %s failed." % url, exc_info=True)
+                return None
+            if resp.status >= 400:
+                return None
+            return time.time() - start
+
+        unique = []
+        for url in urls:
+            if url not in unique:
+                unique.append(url)
+        if not unique:
+            return []
+        pool = concurrency.WorkerPool(max_workers=min(max_workers,
+                                                      len(unique)))
+        try:
+            latencies = pool.map(probe, unique)
+        finally:
+            pool.shutdown()
+        ranked = [(latency, i, url) for i, (url, latency)
+                  in enumerate(zip(unique, latencies)) if latency is not None]
+        ranked.sort()
+        return [(url, latency) for latency, i, url in ranked]
+
+    def _probe_request(self, url, timeout):
+        """ GET ``url`` over a connection of its own that gives up after
+        ``timeout`` seconds.
+        """
+        http = httplib2.Http(timeout=timeout, ca_certs=self.ca_certs,
+                             disable_ssl_certificate_validation=(
+                                 self.disable_ssl_certificate_validation))
+        try:
+            return http.request(url, 'GET',
+                                headers={'User-Agent': self.USER_AGENT})
+        finally:
+            for conn in http.connections.values():
+                conn.close()
+
+    def _http_request(self, url, method, **kwargs):
+        """ Send a request over a connection borrowed from the pool. """
+        http = self.connection_pool.get(url, self)
+        if self.endpoints is not None or self.retry_policy is not None:
+            # Let connection errors through so the request can fail over
+            # or be retried.
+            http.force_exception_to_status_code = False
+        try:
+            return http.request(url, method, **kwargs)
+        finally:
+            self.connection_pool.put(url, http, self)
 
-        for element in kwargs['headers']:
-            header = ' -H "%s: %s"' % (element, kwargs['headers'][element])
-            string_parts.append(header)
+    def _stream_request(self, url, method, headers=None, body=None):
+        """ Send a request whose response body is read incrementally.
 
-        _logger.debug("REQ: %s\n" % "".join(string_parts))
-        if 'body' in kwargs:
-            _logger.debug("REQ BODY: %s\n" % (kwargs['body']))
-        _logger.debug("RESP: %s\nRESP BODY: %s\n", resp, body)
+        Returns the response and an iterator over chunks of its body. The
+        connection is not pooled and is closed once the body is exhausted.
+        """
+        scheme, netloc, path, query, frag = urlparse.urlsplit(url)
+        if scheme == 'https':
+            # Verify certificates exactly as httplib2 does for the other
+            # requests: against ca_certs, or httplib2's own CA bundle.
+            conn = httplib2.HTTPSConnectionWithTimeout(
+                netloc, timeout=self.timeout,
+                ca_certs=self.ca_certs,
+                disable_ssl_certificate_validation=(
+                    self.disable_ssl_certificate_validation))
+        else:
+            conn = httplib.HTTPConnection(netloc, timeout=self.timeout)
+        if query:
+            path = '%s?%s' % (path, query)
+        try:
+            conn.request(method, path or '/', body, headers or {})
+            response = conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+        return httplib2.Response(response), self._iter_chunks(conn, response)
+
+    @staticmethod
+    def _iter_chunks(conn, response, chunk_size=65536):
+        try:
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            conn.close()
 
     def request(self, url, method, **kwargs):
         """ Send an http request with the specified characteristics.
 
         Wrapper around httplib2.Http.request to handle tasks such as
         setting headers, JSON encoding/decoding, and error handling.
+
+        If ``stream`` is True, a successful response's body is returned
+        undecoded as an iterator over chunks of the raw JSON.
         """
         # Copy the kwargs so we can reuse the original in case of redirects
         request_kwargs = copy.copy(kwargs)
-        request_kwargs.setdefault('headers', kwargs.get('headers', {}))
+        request_kwargs['headers'] = dict(kwargs.get('headers', {}))
         request_kwargs['headers']['User-Agent'] = self.USER_AGENT
         if 'body' in kwargs:
             request_kwargs['headers']['Content-Type'] = 'application/json'
             request_kwargs['body'] = json.dumps(kwargs['body'])
 
-        resp, body = super(HTTPClient, self).request(url,
-                                                     method,
-                                                     **request_kwargs)
-
-        self.http_log((url, method,), request_kwargs, resp, body)
+        stream = request_kwargs.pop('stream', False)
+        cache_key = cached = None
+        if (method == 'GET' and not stream and
+                self.response_cache is not None):
+            cache_key = (url, request_kwargs['headers'].get('X-Auth-Token'))
+            cached = self.response_cache.get(cache_key)
+            if cached is not None and not cached.is_fresh():
+                request_kwargs['headers'].update(cached.validators())
+
+        served_from_cache = cached is not None and cached.is_fresh()
+        if self.rate_limiter is not None and not served_from_cache:
+            self.rate_limiter.acquire(url, method)
+
+        if stream:
+            resp, body = self._measure(self._stream_request, url, method,
+                                       **request_kwargs)
+            if resp.status < 300:
+                return resp, body
+            body = ''.join(body)
+        elif served_from_cache:
+            _logger.debug("Using cached response for %s" % url)
+            resp, body = cached.response, cached.body
+        else:
+            resp, body = self._measure(self._http_request, url, method,
+                                       **request_kwargs)
+            if cache_key is not None:
+                if resp.status == 304 and cached is not None:
+                    cached = self.response_cache.revalidate(cache_key,
+                                                            cached, resp)
+                    resp, body = cached.response, cached.body
+                else:
+                    self.response_cache.store(cache_key, resp, body)
+            elif (self.response_cache is not None and
+                    method not in ('GET', 'HEAD') and resp.status < 400):
+                self.response_cache.invalidate(url)
 
         if body:
             try:
                 body = json.loads(body)
             except ValueError, e:
-                _logger.debug("Could not decode JSON from body: %s" % body)
+                _logger.debug("Could not decode JSON from body: %.200r", body)
         else:
             _logger.debug("No body was returned.")
             body = None
 
-        if resp.status in (400, 401, 403, 404, 408, 409, 413, 500, 501):
+        if resp.status in (400, 401, 403, 404, 408, 409, 413, 500, 501, 502,
+                           503, 504):
             _logger.exception("Request returned failure status.")
             raise exceptions.from_response(resp, body)
         elif resp.status in (301, 302, 305):
@@ -134,38 +498,138 @@ class HTTPClient(httplib2.Http):
 
         return resp, body
 
+    def _get_tracer(self):
+        tracer = self.tracer
+        if tracer is None and _logger.isEnabledFor(logging.DEBUG):
+            tracer = tracing.default_tracer
+        if tracer is not None and tracer.sampled():
+            return tracer
+
+    def _measure(self, send, url, method, **kwargs):
+        """ Call ``send(url, method, **kwargs)``, recording its outcome in
+        the client's metrics and tracing it.
+        """
+        tracer = self._get_tracer()
+        if self.metrics is None and tracer is None:
+            return send(url, method, **kwargs)
+        request_body = kwargs.get('body')
+        resp = body = None
+        status = 'error'
+        start = time.time()
+        try:
+            resp, body = send(url, method, **kwargs)
+            status = resp.status
+            return resp, body
+        finally:
+            duration = time.time() - start
+            if self.metrics is not None:
+                bytes_in = isinstance(body, basestring) and len(body) or 0
+                self.metrics.record_request(url, method, status, duration,
+                                            len(request_body or ''),
+                                            bytes_in)
+            if tracer is not None:
+                tracer.trace(method, url, kwargs.get('headers'),
+                             request_body, status, duration, body)
+
+    def _reauthenticate(self, stale_token):
+        """ Replace ``stale_token`` with a fresh one.
+
+        Threads that find the same token rejected at the same time share a
+        single authentication: whoever gets the lock first authenticates,
+        the others see the token has already changed and reuse the result.
+        """
+        with self._auth_lock:
+            if self.auth_token != stale_token:
+                return
+            if self.token_cache is not None:
+                self.token_cache.invalidate(stale_token)
+            if self.metrics is not None:
+                self.metrics.record_reauthentication()
+            self.authenticate()
+
     def _cs_request(self, url, method, **kwargs):
+        policy = kwargs.pop('retry_policy', self.retry_policy)
         if not self.management_url:
-            self.authenticate()
+            with self._auth_lock:
+                if not self.management_url:
+                    self.authenticate()
 
-        kwargs.setdefault('headers', {})
-        if self.auth_token:
-            kwargs['headers']['X-Auth-Token'] = self.auth_token
+        kwargs['headers'] = dict(kwargs.get('headers', {}))
+        auth_token = self.auth_token
+        if auth_token:
+            kwargs['headers']['X-Auth-Token'] = auth_token
 
         # Perform the request once. If we get a 401 back then it
         # might be because the auth token expired, so try to
         # re-authenticate and try again. If it still fails, bail.
         try:
-            resp, body = self.request(self.management_url + url, method,
-                                      **kwargs)
-            return resp, body
+            return self._send_with_retries(url, method, policy, **kwargs)
         except exceptions.Unauthorized:
+            self._reauthenticate(auth_token)
+            kwargs['headers']['X-Auth-Token'] = self.auth_token
+            return self._send_with_retries(url, method, policy, **kwargs)
+
+    def _send_with_retries(self, url, method, policy, **kwargs):
+        """ Send an API request, retrying it as ``policy`` allows. """
+        if policy is None:
+            return self._send(url, method, **kwargs)
+        policy.record_request()
+        attempt = 0
+        while True:
             try:
-                if getattr(self, '_failures', 0) < 1:
-                    self._failures = getattr(self, '_failures', 0) + 1
-                    self.authenticate()
-                    resp, body = self.request(self.management_url + url,
-                                              method, **kwargs)
-                    return resp, body
-                else:
-                    raise
-            except exceptions.Unauthorized:
+                return self._send(url, method, **kwargs)
+            except Exception, e:
+                exc_info = sys.exc_info()
+                if not policy.should_retry(method, e, attempt):
+                    raise exc_info[0], exc_info[1], exc_info[2]
+            delay = policy.delay(attempt, e)
+            _logger.warning("%s %s failed (%s), retrying in %.1fs."
+                            % (method, url, e, delay))
+            if self.metrics is not None:
+                self.metrics.record_retry(method)
+            time.sleep(delay)
+            attempt += 1
+
+    def _send(self, url, method, **kwargs):
+        """ Send an API request, failing over between endpoints if the
+        client has several.
+
+        A request that can't connect is retried on each other endpoint in
+        turn. Timeouts are only retried for idempotent methods, since the
+        server may have acted on the request.
+        """
+        if self.endpoints is None:
+            return self.request(self.management_url + url, method, **kwargs)
+
+        tried = []
+        while True:
+            endpoint = self.endpoints.acquire(exclude=tried)
+            tried.append(endpoint)
+            ok = False
+            try:
+                result = self.request(endpoint + url, method, **kwargs)
+                ok = True
+                return result
+            except exceptions.ClientException, e:
+                # The server answered; only its own failures count against
+                # its health.
+                ok = e.code < 500
                 raise
+            except self.CONNECTION_ERRORS, e:
+                if (len(tried) == len(self.endpoints) or
+                    (isinstance(e, socket.timeout) and
+                     method not in self.IDEMPOTENT_METHODS)):
+                    raise
+                _logger.warning("Request to %s failed (%s), trying another "
+                                "endpoint." % (endpoint, e))
+            finally:
+                self.endpoints.release(endpoint, ok)
 
     def _munge_get_url(self, url):
         """
         Munge GET URLs to always return uncached content.
 
+        Only used when the client was created with ``cache_busting=True``.
         The OpenStack Compute API caches data *very* agressively and doesn't
         respect cache headers. To avoid stale data, then, we append a little
         bit of nonsense onto GET parameters; this appears to force the data not
@@ -177,9 +641,45 @@ class HTTPClient(httplib2.Http):
         query = urllib.urlencode(query)
         return urlparse.urlunsplit((scheme, netloc, path, query, frag))
 
+    def _coalesce(self, key, func):
+        """ Call ``func``, unless a call for ``key`` is already in flight,
+        in which case wait for it and share its result.
+
+        Waiting callers get their own copy of the decoded body.
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = concurrency.Future()
+                self._inflight[key] = future
+
+        if not leader:
+            resp, body = future.result()
+            return resp, copy.deepcopy(body)
+
+        result = exc_info = None
+        try:
+            result = func()
+        except BaseException:
+            exc_info = sys.exc_info()
+            raise
+        finally:
+            # Whatever happened, later callers must not find this call.
+            with self._inflight_lock:
+                del self._inflight[key]
+            future._finish(result=result, exc_info=exc_info)
+        return result
+
     def get(self, url, **kwargs):
-        url = self._munge_get_url(url)
-        return self._cs_request(url, 'GET', **kwargs)
+        if self.cache_busting:
+            url = self._munge_get_url(url)
+        if not self.coalesce_requests or kwargs.get('stream'):
+            return self._cs_request(url, 'GET', **kwargs)
+        key = (url, self.auth_token,
+               tuple(sorted(kwargs.get('headers', {}).items())))
+        return self._coalesce(key, lambda: self._cs_request(url, 'GET',
+                                                            **kwargs))
 
     def post(self, url, **kwargs):
         return self._cs_request(url, 'POST', **kwargs)
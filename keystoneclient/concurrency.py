@@ -0,0 +1,206 @@
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Helpers for issuing several Keystone API calls concurrently.
+"""
+
+import logging
+import Queue
+import sys
+import threading
+import time
+
+
+_logger = logging.getLogger(__name__)
+
+
+class Future(object):
+    """The pending result of a call submitted to a :class:`WorkerPool`."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._exc_info = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def done(self):
+        return self._done.isSet()
+
+    def result(self, timeout=None):
+        """Wait for the call to finish and return its result.
+
+        Re-raises the exception raised by the call, if any.
+        """
+        self._wait(timeout)
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+    def exception(self, timeout=None):
+        """Wait for the call to finish and return the exception it raised,
+        or ``None`` if it succeeded.
+        """
+        self._wait(timeout)
+        if self._exc_info is not None:
+            return self._exc_info[1]
+
+    def add_done_callback(self, fn):
+        """Call ``fn(future)`` once the call finishes."""
+        with self._lock:
+            if not self.done():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _wait(self, timeout):
+        self._done.wait(timeout)
+        if not self.done():
+            raise RuntimeError("Timed out waiting for result.")
+
+    def _finish(self, result=None, exc_info=None):
+        with self._lock:
+            self._result = result
+            self._exc_info = exc_info
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception:
+                _logger.exception("Future callback failed.")
+
+
+class WorkerPool(object):
+    """A fixed-size pool of daemon threads running submitted calls.
+
+    Threads are started on first use. At most ``max_workers`` calls run at
+    once; the rest wait in submission order.
+
+    :param integer max_workers: Number of worker threads.
+    """
+
+    def __init__(self, max_workers=10):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        self.max_workers = max_workers
+        self._queue = Queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule ``fn(*args, **kwargs)`` and return a :class:`Future`."""
+        future = Future()
+        self._start_workers()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def map(self, fn, iterable):
+        """Call ``fn`` on every item concurrently.
+
+        Returns the results in the order of ``iterable``, re-raising the
+        first exception encountered (after every call has finished).
+        """
+        futures = [self.submit(fn, item) for item in iterable]
+        return wait_all(futures)
+
+    def shutdown(self):
+        """Stop the worker threads once queued calls have run."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def _start_workers(self):
+        with self._lock:
+            while len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._work)
+                thread.setDaemon(True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, fn, args, kwargs = item
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                future._finish(exc_info=sys.exc_info())
+            else:
+                future._finish(result=result)
+
+
+def wait_all(futures):
+    """Wait for every future and return their results in order.
+
+    Re-raises the first exception encountered once all have finished.
+    """
+    for future in futures:
+        future.exception()
+    return [future.result() for future in futures]
+
+
+class RateLimiter(object):
+    """Spaces out operations using a token bucket.
+
+    Up to ``burst`` operations may proceed back to back, after which they
+    are let through at ``rate`` per second on average. One limiter may be
+    shared by any number of threads.
+
+    :param float rate: Operations allowed per second.
+    :param integer burst: Operations allowed at once. Defaults to ``rate``
+                          (at least 1).
+    """
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = float(rate)
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._last = time.time()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Take a token if one is available, otherwise return how long to
+        wait for one.
+        """
+        with self._lock:
+            now = time.time()
+            elapsed = max(now - self._last, 0)
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def try_acquire(self):
+        """Take a token without waiting; return whether one was free."""
+        return self._take() == 0
+
+    def acquire(self):
+        """Wait until the next operation may proceed."""
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            time.sleep(wait)
@@ -28,6 +28,9 @@ class ClientException(Exception):
     """
     The base exception class for all exceptions this library raises.
     """
+    # Seconds the server asked to wait before trying again, if it did.
+    retry_after = None
+
     def __init__(self, code, message=None, details=None):
         self.code = code
         self.message = message or self.__class__.message
@@ -117,16 +120,24 @@ def from_response(response, body):
             raise exception_from_response(resp, body)
     """
     cls = _code_map.get(response.status, ClientException)
+    retry_after = response.get('retry-after')
     if body:
         if hasattr(body, 'keys'):
             error = body[body.keys()[0]]
             message = error.get('message', None)
             details = error.get('details', None)
+            retry_after = retry_after or error.get('retryAfter', None)
         else:
             # If we didn't get back a properly formed error message we
             # probably couldn't communicate with Keystone at all.
             message = "Unable to communicate with identity service: %s." % body
             details = None
-        return cls(code=response.status, message=message, details=details)
+        exc = cls(code=response.status, message=message, details=details)
     else:
-        return cls(code=response.status)
+        exc = cls(code=response.status)
+    try:
+        # Only the delay-seconds form of Retry-After is understood.
+        exc.retry_after = max(int(retry_after), 0)
+    except (TypeError, ValueError):
+        pass
+    return exc
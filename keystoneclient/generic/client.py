@@ -80,8 +80,7 @@ class Client(client.HTTPClient):
     def _check_keystone_versions(self, url):
         """ Calls Keystone URL and detects the available API versions """
         try:
-            httpclient = client.HTTPClient()
-            resp, body = httpclient.request(url, "GET",
+            resp, body = self.request(url, "GET",
                                       headers={'Accept': 'application/json'})
             if resp.status in (200, 204):  # in some cases we get No Content
                 try:
@@ -138,10 +137,9 @@ class Client(client.HTTPClient):
     def _check_keystone_extensions(self, url):
         """ Calls Keystone URL and detects the available extensions """
         try:
-            httpclient = client.HTTPClient()
             if not url.endswith("/"):
                 url += '/'
-            resp, body = httpclient.request("%sextensions" % url, "GET",
+            resp, body = self.request("%sextensions" % url, "GET",
                                       headers={'Accept': 'application/json'})
             if resp.status in (200, 204):  # in some cases we get No Content
                 try:
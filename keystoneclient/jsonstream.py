@@ -0,0 +1,149 @@
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Incremental decoding of large JSON list responses.
+"""
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _Reader(object):
+    """Decodes JSON values one at a time from an iterator of chunks."""
+
+    # Drop consumed input once this many characters have been read.
+    COMPACT_SIZE = 65536
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _read_more(self):
+        if self._eof:
+            return False
+        try:
+            chunk = self._chunks.next()
+        except StopIteration:
+            self._eof = True
+            return False
+        if self._pos > self.COMPACT_SIZE:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        self._buf += chunk
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character, or '' at the end."""
+        while True:
+            while (self._pos < len(self._buf) and
+                   self._buf[self._pos] in _WHITESPACE):
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._read_more():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError("Expected %r but found %r at offset %d" %
+                             (char, found, self._pos))
+        self._pos += 1
+
+    def decode(self):
+        """Decode the complete JSON value starting at the next character."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, idx=self._pos)
+            except ValueError:
+                if not self._read_more():
+                    raise
+                continue
+            # A number running up to the end of the buffer may continue in
+            # the next chunk.
+            if end == len(self._buf) and self._read_more():
+                continue
+            self._pos = end
+            return value
+
+    def iter_array(self):
+        """Yield the elements of the JSON array starting here."""
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self.decode()
+            if self.peek() == ',':
+                self._pos += 1
+            else:
+                self.expect(']')
+                return
+
+    def iter_object(self):
+        """Yield the keys of the JSON object starting here.
+
+        After each key is yielded, the reader is positioned on its value,
+        which the caller must consume before asking for the next key.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.decode()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self._pos += 1
+            else:
+                self.expect('}')
+                return
+
+
+def iter_list(chunks, response_key):
+    """Yield the items of a list response as they are decoded.
+
+    ``chunks`` is an iterable of strings making up a JSON body of the form
+    ``{response_key: [...]}`` or ``{response_key: {"values": [...]}}``.
+    Only one item is held in memory at a time besides the read buffer.
+
+    Raises ``KeyError`` if the body has no such list and ``ValueError`` if
+    it isn't valid JSON.
+    """
+    reader = _Reader(chunks)
+    for key in reader.iter_object():
+        if key != response_key:
+            reader.decode()
+            continue
+        if reader.peek() == '[':
+            return reader.iter_array()
+        # NOTE(ja): keystone returns values as list as {'values': [ ... ]}
+        for inner_key in reader.iter_object():
+            if inner_key == 'values' and reader.peek() == '[':
+                return reader.iter_array()
+            reader.decode()
+        break
+    raise KeyError(response_key)
@@ -0,0 +1,249 @@
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Request metrics for Keystone clients.
+"""
+
+import threading
+import urlparse
+
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+NO_OPERATION = 'none'
+
+
+class Histogram(object):
+    """Counts observations falling under each of a set of upper bounds."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        """Return ``(upper bound, observations up to it)`` pairs, ending
+        with an infinite bound counting every observation.
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((bound, total))
+        result.append((float('inf'), self.count))
+        return result
+
+
+class Metrics(object):
+    """Records what a client's requests cost.
+
+    For every request sent to the server this keeps a count by endpoint,
+    method, manager operation and status, a latency histogram by endpoint,
+    method and operation, and the bytes sent and received per endpoint.
+    Re-authentications and retries are counted too. Requests answered from
+    a cache aren't recorded.
+
+    The operation is the manager method that issued the request, such as
+    ``UserManager.get``, or ``none`` for requests made directly on the
+    client. One instance may be shared by several clients::
+
+        >>> stats = metrics.Metrics()
+        >>> keystone = client.Client(..., metrics=stats)
+        >>> keystone.users.list()
+        >>> print stats.to_prometheus()
+
+    :param buckets: Upper bounds of the latency histogram buckets, in
+                    seconds.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = {}
+            self._latency = {}
+            self._bytes_out = {}
+            self._bytes_in = {}
+            self._retries = {}
+            self._reauthentications = 0
+
+    def operation(self, name):
+        """Return a context manager attributing the requests made within
+        it, on the current thread, to the operation ``name``.
+
+        Nested operations are attributed to the outermost one.
+        """
+        return _Operation(self._local, name)
+
+    def current_operation(self):
+        return getattr(self._local, 'operation', None) or NO_OPERATION
+
+    def record_request(self, url, method, status, seconds, bytes_out=0,
+                       bytes_in=0):
+        """Record a request to ``url`` that took ``seconds``.
+
+        ``status`` is the response's status code, or ``error`` if no
+        response was received.
+        """
+        scheme, netloc = urlparse.urlsplit(url)[:2]
+        endpoint = '%s://%s' % (scheme, netloc)
+        operation = self.current_operation()
+        with self._lock:
+            key = (endpoint, method, operation, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            key = (endpoint, method, operation)
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            self._bytes_out[endpoint] = (self._bytes_out.get(endpoint, 0) +
+                                         bytes_out)
+            self._bytes_in[endpoint] = (self._bytes_in.get(endpoint, 0) +
+                                        bytes_in)
+
+    def record_retry(self, method):
+        with self._lock:
+            self._retries[method] = self._retries.get(method, 0) + 1
+
+    def record_reauthentication(self):
+        with self._lock:
+            self._reauthentications += 1
+
+    def snapshot(self):
+        """Return a copy of everything recorded so far, as a dict with the
+        keys:
+
+        * ``requests``: counts by ``(endpoint, method, operation, status)``
+        * ``latency``: by ``(endpoint, method, operation)``, a dict with the
+          ``count`` and ``sum`` of latencies and the cumulative ``buckets``
+        * ``bytes_out`` and ``bytes_in``: totals by endpoint
+        * ``retries``: counts by method
+        * ``reauthentications``: a count
+        """
+        with self._lock:
+            latency = {}
+            for key, histogram in self._latency.items():
+                latency[key] = {'count': histogram.count,
+                                'sum': histogram.sum,
+                                'buckets': histogram.cumulative()}
+            return {'requests': dict(self._requests),
+                    'latency': latency,
+                    'bytes_out': dict(self._bytes_out),
+                    'bytes_in': dict(self._bytes_in),
+                    'retries': dict(self._retries),
+                    'reauthentications': self._reauthentications}
+
+    def to_prometheus(self, prefix='keystoneclient'):
+        """Return the metrics in the Prometheus text exposition format."""
+        stats = self.snapshot()
+        lines = []
+
+        def family(name, kind, doc):
+            lines.append('# HELP %s_%s %s' % (prefix, name, doc))
+            lines.append('# TYPE %s_%s %s' % (prefix, name, kind))
+
+        def sample(name, labels, value):
+            lines.append('%s_%s%s %s' % (prefix, name, _labels(labels),
+                                         _number(value)))
+
+        family('requests_total', 'counter', 'Requests sent.')
+        for key, count in sorted(stats['requests'].items()):
+            sample('requests_total', zip(('endpoint', 'method', 'operation',
+                                          'status'), key), count)
+
+        family('request_duration_seconds', 'histogram',
+               'Time taken by requests.')
+        for key, latency in sorted(stats['latency'].items()):
+            labels = zip(('endpoint', 'method', 'operation'), key)
+            for bound, count in latency['buckets']:
+                sample('request_duration_seconds_bucket',
+                       labels + [('le', bound)], count)
+            sample('request_duration_seconds_sum', labels, latency['sum'])
+            sample('request_duration_seconds_count', labels,
+                   latency['count'])
+
+        family('request_bytes_total', 'counter', 'Request body bytes sent.')
+        for endpoint, count in sorted(stats['bytes_out'].items()):
+            sample('request_bytes_total', [('endpoint', endpoint)], count)
+
+        family('response_bytes_total', 'counter',
+               'Response body bytes received.')
+        for endpoint, count in sorted(stats['bytes_in'].items()):
+            sample('response_bytes_total', [('endpoint', endpoint)], count)
+
+        family('retries_total', 'counter', 'Requests retried.')
+        for method, count in sorted(stats['retries'].items()):
+            sample('retries_total', [('method', method)], count)
+
+        family('reauthentications_total', 'counter',
+               'Re-authentications after a token was rejected.')
+        sample('reauthentications_total', [], stats['reauthentications'])
+
+        return '\n'.join(lines) + '\n'
+
+
+class _Operation(object):
+
+    def __init__(self, local, name):
+        self.local = local
+        self.name = name
+        self.outermost = False
+
+    def __enter__(self):
+        if getattr(self.local, 'operation', None) is None:
+            self.local.operation = self.name
+            self.outermost = True
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.outermost:
+            self.local.operation = None
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for name, value in labels:
+        if not isinstance(value, basestring):
+            value = _number(value)
+        value = (value.replace('\\', '\\\\').replace('"', '\\"')
+                 .replace('\n', '\\n'))
+        parts.append('%s="%s"' % (name, value))
+    return '{%s}' % ','.join(parts)
@@ -0,0 +1,68 @@
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Client-side throttling of requests to stay within API rate limits.
+"""
+
+import threading
+import urlparse
+
+from keystoneclient import concurrency
+
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RequestRateLimiter(object):
+    """Throttles the requests a client sends to each endpoint.
+
+    Requests are sent at no more than ``rate`` per second to each endpoint
+    (scheme, host and port), with reads (``GET``, ``HEAD``, ``OPTIONS``)
+    and writes limited separately. Each limit is a token bucket allowing
+    bursts of ``burst`` requests. A request over the limit waits until it
+    may be sent.
+
+    Share one instance between clients to throttle them together::
+
+        >>> limiter = ratelimit.RequestRateLimiter(rate=20, write_rate=5)
+        >>> keystone = client.Client(..., rate_limiter=limiter)
+
+    :param float rate: Reads allowed per second, and writes unless
+                       ``write_rate`` is given.
+    :param float write_rate: Writes allowed per second. (optional)
+    :param integer burst: Requests allowed back to back. (optional)
+    """
+
+    def __init__(self, rate, write_rate=None, burst=None):
+        self.rates = {'read': rate, 'write': write_rate or rate}
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._limiters = {}
+
+    def _limiter(self, url, method):
+        kind = method in READ_METHODS and 'read' or 'write'
+        key = (urlparse.urlsplit(url)[:2], kind)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = concurrency.RateLimiter(self.rates[kind],
+                                                  burst=self.burst)
+                self._limiters[key] = limiter
+            return limiter
+
+    def acquire(self, url, method):
+        """Wait until a ``method`` request to ``url`` may be sent."""
+        self._limiter(url, method).acquire()
@@ -0,0 +1,149 @@
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Retrying requests that failed for transient reasons.
+"""
+
+import httplib
+import random
+import socket
+import threading
+
+import httplib2
+
+from keystoneclient import exceptions
+
+
+# Errors meaning a request didn't reach a working server.
+CONNECTION_ERRORS = (socket.error, httplib.HTTPException,
+                     httplib2.HttpLib2Error)
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+
+
+class RetryBudget(object):
+    """Caps retries to a fraction of the requests made.
+
+    Every request adds ``ratio`` to the budget and every retry takes one
+    from it, so that when a server is struggling, clients don't multiply
+    its load with retries. Up to ``reserve`` retries can be banked, which
+    is also what the budget starts with. Share one budget between clients
+    to cap their retries together.
+
+    :param float ratio: Retries allowed per request.
+    :param integer reserve: Most retries allowed in a row.
+    """
+
+    def __init__(self, ratio=0.1, reserve=10):
+        self.ratio = ratio
+        self.reserve = reserve
+        self._balance = float(reserve)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._balance = min(self.reserve, self._balance + self.ratio)
+
+    def withdraw(self):
+        """Take a retry from the budget; return whether one was left."""
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+# Limits the retries of every policy not given a budget of its own.
+default_budget = RetryBudget()
+
+
+class RetryPolicy(object):
+    """Decides which failed requests to retry, and when.
+
+    A request is retried when the server turned it away (``413 Over
+    Limit`` or ``503 Service Unavailable``), whatever its method. When it
+    may have failed part way (other 5xx statuses, a ``408`` timeout or a
+    connection error), it is only retried if its method is idempotent.
+
+    Retries wait exponentially longer each time, starting at ``backoff``
+    seconds and never more than ``max_backoff``. With ``jitter``, each
+    wait is a random fraction of that so that clients failing together
+    don't retry together. When the server sends ``Retry-After``, the
+    request is retried after exactly that long, or not at all if it asked
+    for more than ``max_retry_after`` seconds.
+
+    Retries are drawn from ``budget``, by default ``default_budget``, which
+    every policy without a budget of its own shares.
+
+    :param integer max_retries: Retries allowed per request.
+    :param float backoff: Wait before the first retry, in seconds.
+    :param float max_backoff: Longest wait between retries, in seconds.
+    :param boolean jitter: Randomize waits.
+    :param budget: A :class:`RetryBudget` limiting retries overall.
+                   (optional)
+    :param float max_retry_after: Longest ``Retry-After`` waited for, in
+                                  seconds.
+    """
+
+    REFUSED_STATUSES = (413, 503)
+    FAILED_STATUSES = (408, 500, 502, 504)
+
+    def __init__(self, max_retries=3, backoff=0.5, max_backoff=30,
+                 jitter=True, budget=None, max_retry_after=120):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        if budget is None:
+            budget = default_budget
+        self.budget = budget
+        self.max_retry_after = max_retry_after
+
+    def is_retryable(self, method, error):
+        if isinstance(error, exceptions.ClientException):
+            if error.code in self.REFUSED_STATUSES:
+                return True
+            failed = error.code in self.FAILED_STATUSES
+        else:
+            failed = isinstance(error, CONNECTION_ERRORS)
+        return failed and method in IDEMPOTENT_METHODS
+
+    def record_request(self):
+        """Note that a request (not a retry) is being made."""
+        self.budget.deposit()
+
+    def should_retry(self, method, error, attempt):
+        """Return whether to retry after ``error``, the outcome of retry
+        number ``attempt`` (``0`` for the first try).
+        """
+        if attempt >= self.max_retries:
+            return False
+        if not self.is_retryable(method, error):
+            return False
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return False
+        return self.budget.withdraw()
+
+    def delay(self, attempt, error=None):
+        """Return how many seconds to wait before the next try."""
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
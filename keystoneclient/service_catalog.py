@@ -25,29 +25,91 @@ class ServiceCatalog(object):
 
     def __init__(self, resource_dict):
         self.catalog = resource_dict
+        self._build_index()
+
+    def _build_index(self):
+        """Index the catalog's endpoints so lookups don't rescan it.
+
+        Each endpoint is listed, in catalog order, under ``(service_type,
+        None, None)`` and under ``(service_type, attr, value)`` for every
+        attribute it carries.
+        """
+        self._index = {}
+        for service in self.catalog.get('serviceCatalog', []):
+            service_type = service['type']
+            for endpoint in service['endpoints']:
+                self._index.setdefault((service_type, None, None),
+                                       []).append(endpoint)
+                for attr, value in endpoint.iteritems():
+                    try:
+                        self._index.setdefault((service_type, attr, value),
+                                               []).append(endpoint)
+                    except TypeError:
+                        # Unhashable values can't be used as a filter anyway.
+                        continue
 
     def get_token(self):
         return self.catalog['token']['id']
 
+    def get_token_expires(self):
+        return self.catalog['token']['expires']
+
     def url_for(self, attr=None, filter_value=None,
                     service_type='identity', endpoint_type='publicURL'):
         """Fetch an endpoint from the service catalog.
 
         Fetch the specified endpoint from the service catalog for
         a particular endpoint attribute. If no attribute is given, return
-        the first endpoint of the specified type.
+        the first endpoint of the specified type. Endpoints that don't
+        provide ``endpoint_type`` are skipped, as in ``url_map()``.
 
         See tests for a sample service catalog.
         """
-        catalog = self.catalog.get('serviceCatalog', [])
+        if filter_value:
+            key = (service_type, attr, filter_value)
+        else:
+            key = (service_type, None, None)
+
+        try:
+            endpoints = self._index.get(key, [])
+        except TypeError:
+            endpoints = []
+        for endpoint in endpoints:
+            if endpoint_type in endpoint:
+                return endpoint[endpoint_type]
+        raise exceptions.EndpointNotFound('Endpoint not found.')
 
-        for service in catalog:
+    def get_endpoints(self, service_type='identity', endpoint_type=None):
+        """Fetch every endpoint of a service, in all regions.
+
+        Returns the catalog's endpoint dicts for ``service_type`` in catalog
+        order, limited to those providing ``endpoint_type`` if given.
+        """
+        endpoints = []
+        for service in self.catalog.get('serviceCatalog', []):
             if service['type'] != service_type:
                 continue
+            for endpoint in service['endpoints']:
+                if endpoint_type is None or endpoint_type in endpoint:
+                    endpoints.append(endpoint)
+        return endpoints
 
-            endpoints = service['endpoints']
-            for endpoint in endpoints:
-                if not filter_value or endpoint[attr] == filter_value:
-                    return endpoint[endpoint_type]
+    def url_map(self, region=None, endpoint_type='publicURL'):
+        """Fetch the endpoint of every service in the catalog at once.
 
-        raise exceptions.EndpointNotFound('Endpoint not found.')
+        Returns a dict mapping each service type to the URL of its first
+        endpoint of ``endpoint_type``, optionally limited to endpoints in
+        ``region``. Services without a matching endpoint are left out.
+        """
+        urls = {}
+        for service in self.catalog.get('serviceCatalog', []):
+            service_type = service['type']
+            if service_type in urls:
+                continue
+            for endpoint in service['endpoints']:
+                if region and endpoint.get('region') != region:
+                    continue
+                if endpoint_type in endpoint:
+                    urls[service_type] = endpoint[endpoint_type]
+                    break
+        return urls
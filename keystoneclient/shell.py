@@ -23,6 +23,7 @@ import httplib2
 import os
 import sys
 
+from keystoneclient import cache
 from keystoneclient import exceptions as exc
 from keystoneclient import utils
 from keystoneclient.v2_0 import shell as shell_v2_0
@@ -88,6 +89,17 @@ class OpenStackIdentityShell(object):
             default=env('OS_REGION_NAME'),
             help='Defaults to env[OS_REGION_NAME].')
 
+        parser.add_argument('--os-cache',
+            default=utils.bool_from_string(env('OS_CACHE')),
+            action='store_true',
+            help='Reuse tokens and service catalogs across invocations, '
+                 'defaults to env[OS_CACHE].')
+
+        parser.add_argument('--token-cache-file',
+            default=env('OS_TOKEN_CACHE_FILE'),
+            help='Token cache location used with --os-cache, defaults to '
+                 'env[OS_TOKEN_CACHE_FILE] or ~/.keystoneclient/token-cache.')
+
         parser.add_argument('--version',
             default=env('KEYSTONE_VERSION'),
             help='Accepts 1.0 or 1.1, defaults to env[KEYSTONE_VERSION].')
@@ -180,9 +192,12 @@ class OpenStackIdentityShell(object):
         else:
             token = None
             endpoint = None
+            token_cache = None
             if args.token and args.endpoint:
                 token = args.token
                 endpoint = args.endpoint
+            elif args.os_cache:
+                token_cache = cache.FileTokenCache(args.token_cache_file)
             self.cs = self.get_api_class(options.version)(
                 username=args.username,
                 tenant_name=args.tenant_name,
@@ -191,7 +206,8 @@ class OpenStackIdentityShell(object):
                 endpoint=endpoint,
                 password=args.password,
                 auth_url=args.auth_url,
-                region_name=args.region_name)
+                region_name=args.region_name,
+                token_cache=token_cache)
 
         try:
             args.func(self.cs, args)
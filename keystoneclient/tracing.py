@@ -0,0 +1,165 @@
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Structured tracing of the requests made by Keystone clients.
+"""
+
+import logging
+import random
+import re
+import threading
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+
+_logger = logging.getLogger('keystoneclient.client')
+
+REDACTED = '<redacted>'
+
+# Headers and JSON keys whose values are never traced.
+SECRET_HEADERS = ('x-auth-token', 'x-subject-token', 'authorization')
+SECRET_KEYS = ('password', 'secret', 'adminPass')
+
+# Token IDs appearing in URLs, as in ``GET /v2.0/tokens/<id>``.
+_TOKEN_PATH = re.compile(r'(/tokens/)[^/?#]+')
+
+
+class Tracer(object):
+    """Reports each request a client sends as one structured event.
+
+    An event is a dict with the request's ``method``, ``url``, response
+    ``status`` (``error`` if none was received), ``duration`` in seconds,
+    ``request_bytes`` and ``response_bytes``, and the ``request_headers``,
+    ``request_body`` and ``response_body``. Token headers, passwords,
+    secrets and token IDs are redacted, and bodies are cut to ``max_body``
+    characters; bodies over ``max_parse`` bytes are left out since
+    redacting them would mean decoding them.
+
+    Only a ``sample_rate`` fraction of requests is traced. Events are
+    passed to ``sink``, by default logging them at debug level on the
+    ``keystoneclient.client`` logger.
+
+    :param float sample_rate: Fraction of requests traced, from 0 to 1.
+    :param integer max_body: Longest body excerpt kept, in characters.
+    :param integer max_parse: Largest body redacted and kept, in bytes.
+    :param sink: Callable receiving each event. (optional)
+    """
+
+    def __init__(self, sample_rate=1.0, max_body=1024, max_parse=65536,
+                 sink=None):
+        self.sample_rate = sample_rate
+        self.max_body = max_body
+        self.max_parse = max_parse
+        self.sink = sink or self.log
+
+    def sampled(self):
+        """Return whether to trace the next request."""
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def trace(self, method, url, headers, body, status, duration,
+              response_body):
+        """Build and emit the event for a request.
+
+        ``body`` and ``response_body`` are the raw request and response
+        bodies, or ``None``; an iterator stands for a streamed response.
+        """
+        event = {'method': method,
+                 'url': _TOKEN_PATH.sub(r'\1' + REDACTED, url),
+                 'status': status,
+                 'duration': round(duration, 6),
+                 'request_bytes': _size(body),
+                 'response_bytes': _size(response_body),
+                 'request_headers': self._headers(headers),
+                 'request_body': self._body(body),
+                 'response_body': self._body(response_body)}
+        try:
+            self.sink(event)
+        except Exception:
+            _logger.exception("Unable to emit request trace.")
+
+    @staticmethod
+    def log(event):
+        _logger.debug("Request trace: %s", json.dumps(event, sort_keys=True))
+
+    def _headers(self, headers):
+        traced = {}
+        for name, value in (headers or {}).items():
+            if name.lower() in SECRET_HEADERS:
+                value = REDACTED
+            traced[name] = value
+        return traced
+
+    def _body(self, body):
+        if body is None:
+            return None
+        if not isinstance(body, basestring):
+            return '<streamed>'
+        if len(body) > self.max_parse:
+            return '<%d bytes>' % len(body)
+        try:
+            body = json.dumps(_redact(json.loads(body)), sort_keys=True)
+        except ValueError:
+            pass
+        if len(body) > self.max_body:
+            body = '%s...<%d more>' % (body[:self.max_body],
+                                       len(body) - self.max_body)
+        return body
+
+
+def _size(body):
+    if isinstance(body, basestring):
+        return len(body)
+    return None
+
+
+def _redact(value, parent=None):
+    if isinstance(value, dict):
+        redacted = {}
+        for k, v in value.items():
+            if k in SECRET_KEYS or (parent == 'token' and k == 'id'):
+                redacted[k] = REDACTED
+            else:
+                redacted[k] = _redact(v, k)
+        return redacted
+    if isinstance(value, list):
+        return [_redact(v, parent) for v in value]
+    return value
+
+
+_debug_lock = threading.Lock()
+_debug_handler = None
+
+
+def enable_debug_logging():
+    """Print every request trace on stderr.
+
+    Used when ``KEYSTONECLIENT_DEBUG`` is set. A single handler is added to
+    the client logger however many times this is called.
+    """
+    global _debug_handler
+    with _debug_lock:
+        if _debug_handler is None:
+            _debug_handler = logging.StreamHandler()
+            _logger.addHandler(_debug_handler)
+        _logger.setLevel(logging.DEBUG)
+
+
+# Traces requests when the client logger is at debug level and the client
+# has no tracer of its own.
+default_tracer = Tracer()
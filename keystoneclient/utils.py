@@ -1,3 +1,5 @@
+import calendar
+import re
 import uuid
 
 import prettytable
@@ -69,6 +71,41 @@ def find_resource(manager, name_or_id):
         raise exceptions.CommandError(msg)
 
 
+_ISOTIME_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})'
+                         r'(?:\.\d+)?(Z|[+-]\d{2}:?\d{2})?$')
+
+
+def parse_isotime(timestr):
+    """Convert an ISO 8601 timestamp such as a token's ``expires`` value
+    into seconds since the epoch.
+
+    Timestamps without a UTC offset are assumed to be in UTC. Raises
+    ``ValueError`` if the string can't be parsed.
+    """
+    match = _ISOTIME_RE.match(str(timestr).strip())
+    if not match:
+        raise ValueError("Invalid ISO 8601 timestamp: %s" % timestr)
+    fields = [int(f) for f in match.groups()[:6]]
+    seconds = calendar.timegm(fields + [0, 0, 0])
+    offset = match.group(7)
+    if offset and offset != 'Z':
+        sign = offset[0] == '-' and -1 or 1
+        offset = offset[1:].replace(':', '')
+        seconds -= sign * (int(offset[:2]) * 3600 + int(offset[2:]) * 60)
+    return seconds
+
+
+def bool_from_string(subject):
+    """Interpret a string such as an environment variable's value as a
+    boolean.
+
+    Only ``1``, ``true``, ``yes``, ``on`` and ``y`` (in any case) are true.
+    """
+    if isinstance(subject, bool):
+        return subject
+    return str(subject).strip().lower() in ('1', 'true', 'yes', 'on', 'y')
+
+
 def unauthenticated(f):
     """ Adds 'unauthenticated' attribute to decorated function.
 
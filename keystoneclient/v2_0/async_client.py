@@ -0,0 +1,92 @@
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import inspect
+
+from keystoneclient import concurrency
+from keystoneclient.v2_0 import client
+
+
+class AsyncManager(object):
+    """Wraps a manager so that its public methods return futures.
+
+    Calls run on the client's worker pool and go through the wrapped
+    manager unchanged, so requests, responses and errors are handled
+    exactly as in the synchronous client.
+    """
+
+    def __init__(self, manager, pool):
+        self.manager = manager
+        self.pool = pool
+
+    def __getattr__(self, name):
+        attr = getattr(self.manager, name)
+        # Managers built with metrics hold plain functions in place of
+        # their methods, so anything callable but a class is wrapped.
+        if (name.startswith('_') or not callable(attr) or
+            inspect.isclass(attr)):
+            return attr
+
+        def _submit(*args, **kwargs):
+            return self.pool.submit(attr, *args, **kwargs)
+        _submit.__name__ = name
+        _submit.__doc__ = attr.__doc__
+        return _submit
+
+
+class AsyncClient(object):
+    """Client for the OpenStack Keystone v2.0 API returning futures.
+
+    Mirrors :class:`keystoneclient.v2_0.client.Client`, but each manager
+    call is run on a pool of ``max_workers`` threads sharing one
+    thread-safe client, and returns a
+    :class:`keystoneclient.concurrency.Future` immediately. Resources
+    returned by a future still lazy-load synchronously.
+
+    :param keystone: An existing :class:`keystoneclient.v2_0.client.Client`
+                     to wrap. (optional)
+    :param integer max_workers: Number of calls run at once.
+
+    Any other keyword arguments are used to create the wrapped client.
+
+    Example::
+
+        >>> from keystoneclient.v2_0 import async_client
+        >>> keystone = async_client.AsyncClient(username=USER,
+                                                password=PASS,
+                                                tenant_name=TENANT_NAME,
+                                                auth_url=KEYSTONE_URL)
+        >>> futures = [keystone.users.get(user_id) for user_id in USER_IDS]
+        >>> users = concurrency.wait_all(futures)
+
+    """
+
+    MANAGERS = ('ec2', 'roles', 'services', 'tenants', 'tokens', 'users')
+
+    def __init__(self, keystone=None, max_workers=10, **kwargs):
+        self.client = keystone or client.Client(**kwargs)
+        self.pool = concurrency.WorkerPool(max_workers=max_workers)
+        for name in self.MANAGERS:
+            setattr(self, name, AsyncManager(getattr(self.client, name),
+                                             self.pool))
+
+    def authenticate(self):
+        """Authenticate in the background, see ``Client.authenticate``."""
+        return self.pool.submit(self.client.authenticate)
+
+    def close(self):
+        """Stop the worker threads and any background token renewal."""
+        self.pool.shutdown()
+        self.client.stop_token_renewal()
@@ -17,6 +17,7 @@ import logging
 from keystoneclient import client
 from keystoneclient import exceptions
 from keystoneclient import service_catalog
+from keystoneclient import utils
 from keystoneclient.v2_0 import ec2
 from keystoneclient.v2_0 import roles
 from keystoneclient.v2_0 import services
@@ -45,6 +46,69 @@ class Client(client.HTTPClient):
                             instantiation.(optional)
     :param integer timeout: Allows customization of the timeout for client
                             http requests. (optional)
+    :param token_cache: A :class:`keystoneclient.cache.TokenCache` consulted
+                        before authenticating, so clients sharing it reuse
+                        each other's unexpired tokens. (optional)
+    :param integer renew_margin: If set, the token is renewed in the
+                                 background this many seconds before it
+                                 expires. Call ``stop_token_renewal()`` when
+                                 done with the client. (optional)
+    :param connection_pool: A :class:`keystoneclient.client.ConnectionPool`
+                            to draw connections from. Defaults to a pool
+                            shared by every client in the process.
+                            (optional)
+    :param response_cache: A :class:`keystoneclient.cache.ResponseCache`
+                           for GET responses, or ``False`` to disable
+                           caching. Defaults to a cache private to the
+                           client. (optional)
+    :param boolean cache_busting: Append a unique ``fresh`` parameter to
+                                  every GET instead of caching. (optional)
+    :param integer catalog_cache_ttl: If set, ``roles.list()`` and
+                                      ``services.list()`` results are
+                                      reused for this many seconds (see
+                                      ``Manager.enable_list_cache``).
+                                      (optional)
+    :param boolean select_fastest_endpoint: When no ``region_name`` is
+                                            given, probe the identity admin
+                                            endpoints of every region after
+                                            authenticating and use the
+                                            fastest healthy one. They are
+                                            probed again only when the
+                                            catalog changes. (optional)
+    :param endpoints: A :class:`keystoneclient.balancer.EndpointSet`, or a
+                      list of equivalent endpoint URLs, to spread requests
+                      over and fail over between. (optional)
+    :param retry_policy: A :class:`keystoneclient.retry.RetryPolicy` for
+                         requests failing for transient reasons. (optional)
+    :param rate_limiter: A
+                         :class:`keystoneclient.ratelimit.RequestRateLimiter`
+                         throttling requests, which may be shared between
+                         clients. (optional)
+    :param integer entity_cache_ttl: If set, users and tenants returned by
+                                     ``get()`` and ``list()`` are reused by
+                                     ``get()`` for this many seconds (see
+                                     ``Manager.enable_entity_cache``).
+                                     (optional)
+    :param boolean coalesce_requests: Share one request between threads
+                                      making the same GET at the same
+                                      time. Defaults to True. (optional)
+    :param metrics: A :class:`keystoneclient.metrics.Metrics` recording the
+                    requests made, which may be shared between clients.
+                    (optional)
+    :param tracer: A :class:`keystoneclient.tracing.Tracer` receiving an
+                   event for each request. (optional)
+    :param boolean compact_resources: Return memory-compact resources
+                                      (see :class:`keystoneclient.base.
+                                      CompactResource`), which are not
+                                      instances of the usual resource
+                                      classes. (optional)
+    :param boolean lazy_loading: If False, looking up a missing attribute
+                                 on a resource that isn't loaded never
+                                 fetches it; a
+                                 :class:`keystoneclient.base.LazyLoadWarning`
+                                 is issued instead. Use
+                                 :func:`keystoneclient.base.prefetch` to load
+                                 resources explicitly. (optional)
 
     Example::
 
@@ -60,14 +124,27 @@ class Client(client.HTTPClient):
 
     """
 
-    def __init__(self, endpoint=None, **kwargs):
+    def __init__(self, endpoint=None, compact_resources=False,
+                 catalog_cache_ttl=None, select_fastest_endpoint=False,
+                 lazy_loading=True, entity_cache_ttl=None, **kwargs):
         """ Initialize a new client for the Keystone v2.0 API. """
         super(Client, self).__init__(endpoint=endpoint, **kwargs)
+        self.compact_resources = compact_resources
+        self.lazy_loading = lazy_loading
+        self.select_fastest_endpoint = select_fastest_endpoint
+        # The admin URLs last probed and the one picked among them.
+        self._probed_endpoints = None
         self.roles = roles.RoleManager(self)
         self.services = services.ServiceManager(self)
         self.tenants = tenants.TenantManager(self)
         self.tokens = tokens.TokenManager(self)
         self.users = users.UserManager(self)
+        if catalog_cache_ttl:
+            self.roles.enable_list_cache(ttl=catalog_cache_ttl)
+            self.services.enable_list_cache(ttl=catalog_cache_ttl)
+        if entity_cache_ttl:
+            self.users.enable_entity_cache(ttl=entity_cache_ttl)
+            self.tenants.enable_entity_cache(ttl=entity_cache_ttl)
         # NOTE(gabriel): If we have a pre-defined endpoint then we can
         #                get away with lazy auth. Otherwise auth immediately.
 
@@ -90,14 +167,19 @@ class Client(client.HTTPClient):
 
         Returns ``True`` if authentication was successful.
         """
-        self.management_url = self.auth_url
+        token = self.auth_token
+        if self.password:
+            # NOTE: Re-authenticate with the password when we have one; the
+            # token we hold may be the expired one we're trying to replace.
+            token = None
         try:
             raw_token = self.tokens.authenticate(username=self.username,
                                                  tenant_id=self.tenant_id,
                                                  tenant_name=self.tenant_name,
                                                  password=self.password,
-                                                 token=self.auth_token,
-                                                 return_raw=True)
+                                                 token=token,
+                                                 return_raw=True,
+                                                 auth_url=self.auth_url)
             self._extract_service_catalog(self.auth_url, raw_token)
             return True
         except (exceptions.AuthorizationFailure, exceptions.Unauthorized):
@@ -108,19 +190,62 @@ class Client(client.HTTPClient):
                                                   "%s" % e)
 
     def _extract_service_catalog(self, url, body):
-        """ Set the client's service catalog from the response data. """
-        self.service_catalog = service_catalog.ServiceCatalog(body)
+        """ Set the client's service catalog from the response data.
+
+        The new token and management URL are only swapped in once both are
+        known, so requests issued concurrently with a renewal always use a
+        valid pair.
+        """
+        catalog = service_catalog.ServiceCatalog(body)
         try:
-            self.auth_token = self.service_catalog.get_token()
+            auth_token = catalog.get_token()
         except KeyError:
             raise exceptions.AuthorizationFailure()
 
         # FIXME(ja): we should be lazy about setting managment_url.
         # in fact we should rewrite the client to support the service
         # catalog (api calls should be directable to any endpoints)
+        management_url = url
         try:
-            self.management_url = self.service_catalog.url_for(attr='region',
+            management_url = catalog.url_for(attr='region',
                 filter_value=self.region_name, endpoint_type='adminURL')
-        except:
+        except exceptions.EndpointNotFound:
             # Unscoped tokens don't return a service catalog
-            _logger.exception("unable to retrieve service catalog with token")
+            _logger.debug("No identity endpoint in the service catalog.")
+        else:
+            if self.select_fastest_endpoint and not self.region_name:
+                management_url = self._fastest_endpoint(catalog,
+                                                        management_url)
+
+        self.service_catalog = catalog
+        self.auth_token = auth_token
+        self.management_url = management_url
+
+        try:
+            expires = utils.parse_isotime(catalog.get_token_expires())
+        except (KeyError, ValueError):
+            expires = None
+        self._schedule_token_renewal(expires)
+
+    def _fastest_endpoint(self, catalog, default):
+        """ Return the identity admin URL answering fastest, or ``default``
+        if none of them is healthy.
+
+        Endpoints are only probed when the catalog lists different ones
+        from last time, so renewing or re-authenticating reuses the choice.
+        """
+        endpoints = catalog.get_endpoints(service_type='identity',
+                                          endpoint_type='adminURL')
+        urls = tuple(e['adminURL'] for e in endpoints)
+        probed = self._probed_endpoints
+        if probed is not None and probed[0] == urls:
+            return probed[1]
+        ranked = self.probe_endpoints(urls)
+        if ranked:
+            fastest = ranked[0][0]
+        else:
+            _logger.warning("No identity endpoint answered, using %s."
+                            % default)
+            fastest = default
+        self._probed_endpoints = (urls, fastest)
+        return fastest
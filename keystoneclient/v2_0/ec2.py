@@ -17,6 +17,9 @@ from keystoneclient import base
 
 
 class EC2(base.Resource):
+    compact_fields = ('access', 'secret', 'tenant_id', 'user_id',
+                      'enabled')
+
     def __repr__(self):
         return "<EC2 %s>" % self._info
 
@@ -15,9 +15,12 @@
 #    under the License.
 
 from keystoneclient import base
+from keystoneclient import concurrency
 
 
 class Role(base.Resource):
+    compact_fields = ('id', 'name', 'description', 'serviceId')
+
     def __repr__(self):
         return "<Role %s>" % self._info
 
@@ -48,7 +51,7 @@ class RoleManager(base.ManagerWithFind):
         """
         List all available roles.
         """
-        return self._list("/OS-KSADM/roles", "roles")
+        return self._list("/OS-KSADM/roles", "roles", use_cache=True)
 
     def roles_for_user(self, user, tenant=None):
         user_id = base.getid(user)
@@ -59,6 +62,32 @@ class RoleManager(base.ManagerWithFind):
         else:
             return self._list("/users/%s/roles" % user_id, "roles")
 
+    def roles_for_users(self, pairs, max_workers=10):
+        """ Resolve the roles of many users at once.
+
+        ``pairs`` is an iterable of ``(user, tenant)`` tuples, with a
+        ``None`` tenant for global roles. Requests for the same pair are
+        only made once, and at most ``max_workers`` are in flight at a
+        time.
+
+        Returns a dict mapping each ``(user_id, tenant_id)`` to its list of
+        roles. If any request fails, its exception is raised once the
+        others have finished.
+        """
+        keys = []
+        seen = set()
+        for user, tenant in pairs:
+            key = (base.getid(user), tenant and base.getid(tenant) or None)
+            if key not in seen:
+                seen.add(key)
+                keys.append(key)
+        pool = concurrency.WorkerPool(max_workers=max_workers)
+        try:
+            results = pool.map(lambda key: self.roles_for_user(*key), keys)
+        finally:
+            pool.shutdown()
+        return dict(zip(keys, results))
+
     def add_user_role(self, user, role, tenant=None):
         """ Adds a role to a user.
 
@@ -75,6 +104,50 @@ class RoleManager(base.ManagerWithFind):
             route = "/users/%s/roles/OS-KSADM/%s"
             return self._update(route % (user_id, role_id), None, "roles")
 
+    def add_user_roles(self, grants, max_workers=10, rate=None):
+        """ Grant many roles at once.
+
+        ``grants`` is an iterable of ``(user, role, tenant)`` tuples, with a
+        ``None`` tenant for global roles. At most ``max_workers`` requests
+        are in flight at a time and, if ``rate`` is given, no more than
+        ``rate`` are started per second.
+
+        Every grant is attempted. Returns a list of ``(grant, error)``
+        tuples in the order of ``grants``, where ``error`` is the exception
+        raised for that grant or ``None`` if it succeeded.
+        """
+        return self._run_batch(self.add_user_role, grants, max_workers, rate)
+
+    def remove_user_roles(self, grants, max_workers=10, rate=None):
+        """ Revoke many roles at once.
+
+        Takes and returns the same as :meth:`add_user_roles`.
+        """
+        return self._run_batch(self.remove_user_role, grants, max_workers,
+                               rate)
+
+    def _run_batch(self, func, grants, max_workers, rate):
+        grants = list(grants)
+        limiter = None
+        if rate:
+            limiter = concurrency.RateLimiter(rate)
+
+        def _run(grant):
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                user, role, tenant = grant
+                func(user, role, tenant)
+            except Exception, e:
+                return e
+
+        pool = concurrency.WorkerPool(max_workers=max_workers)
+        try:
+            errors = pool.map(_run, grants)
+        finally:
+            pool.shutdown()
+        return zip(grants, errors)
+
     def remove_user_role(self, user, role, tenant=None):
         """ Removes a role from a user.
 
@@ -89,4 +162,4 @@ class RoleManager(base.ManagerWithFind):
             return self._delete(route % params)
         else:
             route = "/users/%s/roles/OS-KSADM/%s"
-            return self._delete(route % (user_id, role_id), "roles")
+            return self._delete(route % (user_id, role_id))
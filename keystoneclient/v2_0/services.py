@@ -18,6 +18,8 @@ from keystoneclient import base
 
 
 class Service(base.Resource):
+    compact_fields = ('id', 'name', 'type', 'description')
+
     def __repr__(self):
         return "<Service %s>" % self._info
 
@@ -26,7 +28,8 @@ class ServiceManager(base.ManagerWithFind):
     resource_class = Service
 
     def list(self):
-        return self._list("/OS-KSADM/services", "OS-KSADM:services")
+        return self._list("/OS-KSADM/services", "OS-KSADM:services",
+                          use_cache=True)
 
     def get(self, id):
         return self._get("/OS-KSADM/services/%s" % id, "OS-KSADM:service")
@@ -20,6 +20,8 @@ from keystoneclient import base
 
 
 class Tenant(base.Resource):
+    compact_fields = ('id', 'name', 'description', 'enabled')
+
     def __repr__(self):
         return "<Tenant %s>" % self._info
 
@@ -31,14 +33,10 @@ class Tenant(base.Resource):
         return self.manager.update(self.id, description, enabled)
 
     def add_user(self, user, role):
-        return self.manager.api.roles.add_user_to_tenant(self.id,
-                                                         base.getid(user),
-                                                         base.getid(role))
+        return self.manager.add_user(self, user, role)
 
     def remove_user(self, user, role):
-        return self.manager.api.roles.remove_user_from_tenant(self.id,
-                                                              base.getid(user),
-                                                              base.getid(role))
+        return self.manager.remove_user(self, user, role)
 
     def list_users(self):
         return self.manager.list_users(self.id)
@@ -46,9 +44,11 @@ class Tenant(base.Resource):
 
 class TenantManager(base.ManagerWithFind):
     resource_class = Tenant
+    query_attrs = ('name',)
 
     def get(self, tenant_id):
-        return self._get("/tenants/%s" % tenant_id, "tenant")
+        return self._get("/tenants/%s" % tenant_id, "tenant",
+                         entity_id=tenant_id)
 
     def create(self, tenant_name, description=None, enabled=True):
         """
@@ -60,9 +60,12 @@ class TenantManager(base.ManagerWithFind):
 
         return self._create('/tenants', params, "tenant")
 
-    def list(self, limit=None, marker=None):
+    def list(self, limit=None, marker=None, stream=False):
         """
         Get a list of tenants.
+
+        :param stream: Decode the response incrementally and return an
+                       iterator yielding each tenant as it is decoded.
         :rtype: list of :class:`Tenant`
         """
 
@@ -76,7 +79,21 @@ class TenantManager(base.ManagerWithFind):
         if params:
             query = "?" + urllib.urlencode(params)
 
-        return self._list("/tenants%s" % query, "tenants")
+        return self._list("/tenants%s" % query, "tenants", stream=stream)
+
+    def iter_all(self, page_size=100, prefetch=False):
+        """
+        Iterate over every tenant, following markers from page to page so
+        only ``page_size`` tenants are held in memory at a time.
+
+        :param prefetch: Fetch the next page while the current one is being
+                         consumed.
+        :rtype: iterator of :class:`Tenant`
+        """
+        return self._iter_pages(self.list, page_size, prefetch=prefetch)
+
+    def _query(self, **filters):
+        return self._query_get("/tenants", filters, "tenant", "tenants")
 
     def update(self, tenant_id, tenant_name=None, description=None,
                enabled=None):
@@ -91,13 +108,19 @@ class TenantManager(base.ManagerWithFind):
         if description:
             body['tenant']['description'] = description
         # Keystone's API uses a POST rather than a PUT here.
-        return self._create("/tenants/%s" % tenant_id, body, "tenant")
+        try:
+            return self._create("/tenants/%s" % tenant_id, body, "tenant")
+        finally:
+            self._forget_entity(tenant_id)
 
     def delete(self, tenant):
         """
         Delete a tenant.
         """
-        return self._delete("/tenants/%s" % (base.getid(tenant)))
+        try:
+            return self._delete("/tenants/%s" % (base.getid(tenant)))
+        finally:
+            self._forget_entity(base.getid(tenant))
 
     def list_users(self, tenant):
         """ List users for a tenant. """
@@ -105,12 +128,8 @@ class TenantManager(base.ManagerWithFind):
 
     def add_user(self, tenant, user, role):
         """ Add a user to a tenant with the given role. """
-        return self.api.roles.add_user_to_tenant(base.getid(tenant),
-                                                 base.getid(user),
-                                                 base.getid(role))
+        return self.api.roles.add_user_role(user, role, tenant)
 
     def remove_user(self, tenant, user, role):
         """ Remove the specified role from the user on the tenant. """
-        return self.api.roles.remove_user_from_tenant(base.getid(tenant),
-                                                      base.getid(user),
-                                                      base.getid(role))
+        return self.api.roles.remove_user_role(user, role, tenant)
@@ -22,7 +22,31 @@ class TokenManager(base.ManagerWithFind):
     resource_class = Token
 
     def authenticate(self, username=None, tenant_id=None, tenant_name=None,
-                     password=None, token=None, return_raw=False):
+                     password=None, token=None, return_raw=False,
+                     auth_url=None):
+        """ Authenticate, reusing a cached token where possible.
+
+        If the client was given a ``token_cache``, an unexpired token
+        previously obtained with the same credentials is returned without
+        contacting the server, and newly issued tokens are added to it.
+
+        The request is sent to the client's management URL unless
+        ``auth_url`` is given. It is sent once: a ``401`` means the
+        credentials were refused and is raised rather than answered by
+        re-authenticating.
+        """
+        token_cache = getattr(self.api, 'token_cache', None)
+        if token_cache is not None:
+            url = auth_url or self.api.management_url
+            key = token_cache.key(url, username=username,
+                                  tenant_id=tenant_id, tenant_name=tenant_name,
+                                  password=password, token=token)
+            access = token_cache.get(key)
+            if access is not None:
+                if return_raw:
+                    return access
+                return self.resource_class(self, access)
+
         if token:
             params = {"auth": {"token": {"id": token}}}
         elif username and password:
@@ -34,7 +58,18 @@ class TokenManager(base.ManagerWithFind):
             params['auth']['tenantId'] = tenant_id
         elif tenant_name:
             params['auth']['tenantName'] = tenant_name
-        return self._create('/tokens', params, "access", return_raw=return_raw)
+        headers = {}
+        if token:
+            headers['X-Auth-Token'] = token
+        url = auth_url or self.api.management_url
+        resp, body = self.api.request(url + '/tokens', 'POST', body=params,
+                                      headers=headers)
+        access = body['access']
+        if token_cache is not None:
+            token_cache.set(key, access)
+        if return_raw:
+            return access
+        return self.resource_class(self, access)
 
     def delete(self, token):
         return self._delete("/tokens/%s" % base.getid(token))
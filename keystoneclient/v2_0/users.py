@@ -17,9 +17,12 @@
 import urllib
 
 from keystoneclient import base
+from keystoneclient import concurrency
 
 
 class User(base.Resource):
+    compact_fields = ('id', 'name', 'email', 'enabled', 'tenantId')
+
     def __repr__(self):
         return "<User %s>" % self._info
 
@@ -32,9 +35,11 @@ class User(base.Resource):
 
 class UserManager(base.ManagerWithFind):
     resource_class = User
+    query_attrs = ('name',)
 
     def get(self, user):
-        return self._get("/users/%s" % base.getid(user), "user")
+        user_id = base.getid(user)
+        return self._get("/users/%s" % user_id, "user", entity_id=user_id)
 
     def update_email(self, user, email):
         """
@@ -44,7 +49,10 @@ class UserManager(base.ManagerWithFind):
         params = {"user": {"id": base.getid(user),
                            "email": email}}
 
-        return self._update("/users/%s" % base.getid(user), params, "user")
+        try:
+            return self._update("/users/%s" % base.getid(user), params, "user")
+        finally:
+            self._forget_entity(base.getid(user))
 
     def update_enabled(self, user, enabled):
         """
@@ -53,8 +61,11 @@ class UserManager(base.ManagerWithFind):
         params = {"user": {"id": base.getid(user),
                            "enabled": enabled}}
 
-        self._update("/users/%s/OS-KSADM/enabled" % base.getid(user), params,
-                "user")
+        try:
+            self._update("/users/%s/OS-KSADM/enabled" % base.getid(user),
+                         params, "user")
+        finally:
+            self._forget_entity(base.getid(user))
 
     def update_password(self, user, password):
         """
@@ -63,8 +74,11 @@ class UserManager(base.ManagerWithFind):
         params = {"user": {"id": base.getid(user),
                            "password": password}}
 
-        return self._update("/users/%s/password" % base.getid(user),
-                            params, "user")
+        try:
+            return self._update("/users/%s/password" % base.getid(user),
+                                params, "user")
+        finally:
+            self._forget_entity(base.getid(user))
 
     def update_tenant(self, user, tenant):
         """
@@ -75,8 +89,11 @@ class UserManager(base.ManagerWithFind):
 
         # FIXME(ja): seems like a bad url - default tenant is an attribute
         #            not a subresource!???
-        return self._update("/users/%s/tenant" % base.getid(user),
-                            params, "user")
+        try:
+            return self._update("/users/%s/tenant" % base.getid(user),
+                                params, "user")
+        finally:
+            self._forget_entity(base.getid(user))
 
     def create(self, name, password, email, tenant_id=None, enabled=True):
         """
@@ -90,16 +107,73 @@ class UserManager(base.ManagerWithFind):
                            "enabled": enabled}}
         return self._create('/users', params, "user")
 
+    def provision(self, specs, max_workers=10, rate=None):
+        """
+        Create many users, each with its tenant, roles and credentials.
+
+        ``specs`` is an iterable of dicts with the keys ``name``,
+        ``password``, ``email`` and optionally ``enabled``, ``tenant`` (the
+        user's default tenant, a tenant or its ID), ``roles`` (roles to
+        grant on that tenant, or globally without one) and ``ec2`` (true to
+        create EC2 credentials for the tenant).
+
+        For each user the steps run in order, stopping at the first error;
+        different users are provisioned concurrently on at most
+        ``max_workers`` threads, and if ``rate`` is given no more than
+        ``rate`` requests are started per second. Users created before a
+        later step failed are not deleted.
+
+        Returns a list of ``(user, credentials, error)`` tuples in the order
+        of ``specs``: ``user`` is the created :class:`User` (or ``None``),
+        ``credentials`` the EC2 credentials (or ``None``), and ``error`` the
+        exception that stopped the user's provisioning, or ``None``.
+        """
+        limiter = None
+        if rate:
+            limiter = concurrency.RateLimiter(rate)
+
+        def call(func, *args):
+            if limiter is not None:
+                limiter.acquire()
+            return func(*args)
+
+        def _provision(spec):
+            user = credentials = None
+            tenant_id = spec.get('tenant') and base.getid(spec['tenant'])
+            try:
+                user = call(self.create, spec['name'], spec.get('password'),
+                            spec.get('email'), tenant_id,
+                            spec.get('enabled', True))
+                for role in spec.get('roles', ()):
+                    call(self.api.roles.add_user_role, user, role, tenant_id)
+                if spec.get('ec2'):
+                    credentials = call(self.api.ec2.create, user.id,
+                                       tenant_id)
+            except Exception, e:
+                return user, credentials, e
+            return user, credentials, None
+
+        pool = concurrency.WorkerPool(max_workers=max_workers)
+        try:
+            return pool.map(_provision, specs)
+        finally:
+            pool.shutdown()
+
     def delete(self, user):
         """
         Delete a user.
         """
-        return self._delete("/users/%s" % base.getid(user))
+        try:
+            return self._delete("/users/%s" % base.getid(user))
+        finally:
+            self._forget_entity(base.getid(user))
 
-    def list(self, tenant_id=None, limit=None, marker=None):
+    def list(self, tenant_id=None, limit=None, marker=None, stream=False):
         """
         Get a list of users (optionally limited to a tenant)
 
+        :param stream: Decode the response incrementally and return an
+                       iterator yielding each user as it is decoded.
         :rtype: list of :class:`User`
         """
 
@@ -107,17 +181,34 @@ class UserManager(base.ManagerWithFind):
         if limit:
             params['limit'] = int(limit)
         if marker:
-            params['marker'] = int(marker)
+            params['marker'] = marker
 
         query = ""
         if params:
             query = "?" + urllib.urlencode(params)
 
         if not tenant_id:
-            return self._list("/users%s" % query, "users")
+            return self._list("/users%s" % query, "users", stream=stream)
         else:
             return self._list("/tenants/%s/users%s" % (tenant_id, query),
-                              "users")
+                              "users", stream=stream)
+
+    def iter_all(self, tenant_id=None, page_size=100, prefetch=False):
+        """
+        Iterate over every user (optionally limited to a tenant), following
+        markers from page to page so only ``page_size`` users are held in
+        memory at a time.
+
+        :param prefetch: Fetch the next page while the current one is being
+                         consumed.
+        :rtype: iterator of :class:`User`
+        """
+        def list_page(limit, marker):
+            return self.list(tenant_id=tenant_id, limit=limit, marker=marker)
+        return self._iter_pages(list_page, page_size, prefetch=prefetch)
+
+    def _query(self, **filters):
+        return self._query_get("/users", filters, "user", "users")
 
     def list_roles(self, user, tenant=None):
         return self.api.roles.roles_for_user(base.getid(user),
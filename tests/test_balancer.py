@@ -0,0 +1,57 @@
+import mock
+
+from keystoneclient import balancer
+from tests import utils
+
+
+class EndpointSetTest(utils.TestCase):
+
+    def test_round_robin(self):
+        endpoints = balancer.EndpointSet(["http://a/", "http://b",
+                                          "http://a"])
+        self.assertEqual(len(endpoints), 2)
+        picked = []
+        for i in range(4):
+            url = endpoints.acquire()
+            endpoints.release(url)
+            picked.append(url)
+        self.assertEqual(picked, ["http://a", "http://b"] * 2)
+
+    def test_least_outstanding(self):
+        endpoints = balancer.EndpointSet(["http://a", "http://b"],
+                                         strategy=balancer.LEAST_OUTSTANDING)
+        self.assertEqual(endpoints.acquire(), "http://a")
+        self.assertEqual(endpoints.acquire(), "http://b")
+        endpoints.release("http://b")
+        self.assertEqual(endpoints.acquire(), "http://b")
+
+    def test_failed_endpoint_avoided(self):
+        now = [1000]
+        with mock.patch('time.time', lambda: now[0]):
+            endpoints = balancer.EndpointSet(["http://a", "http://b"],
+                                             cooldown=30)
+            endpoints.release(endpoints.acquire(), ok=False)
+            self.assertFalse(endpoints.is_healthy("http://a"))
+            for i in range(3):
+                url = endpoints.acquire()
+                endpoints.release(url)
+                self.assertEqual(url, "http://b")
+
+            # With every endpoint down, the one due back first is used.
+            endpoints.release(endpoints.acquire(), ok=False)
+            self.assertEqual(endpoints.acquire(), "http://a")
+            endpoints.release("http://a", ok=True)
+
+            now[0] += 31
+            self.assertTrue(endpoints.is_healthy("http://b"))
+
+    def test_exclude(self):
+        endpoints = balancer.EndpointSet(["http://a", "http://b"])
+        self.assertEqual(endpoints.acquire(exclude=["http://a"]), "http://b")
+        self.assertRaises(ValueError, endpoints.acquire,
+                          exclude=["http://a", "http://b"])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, balancer.EndpointSet, [])
+        self.assertRaises(ValueError, balancer.EndpointSet, ["http://a"],
+                          strategy="random")
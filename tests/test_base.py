@@ -1,8 +1,11 @@
+import warnings
+
 import mock
 import mox
 
 from keystoneclient import base
 from keystoneclient import exceptions
+from keystoneclient.v2_0 import client
 from keystoneclient.v2_0 import roles
 from tests import utils
 
@@ -46,3 +49,87 @@ class BaseTest(utils.TestCase):
         r1 = base.Resource(None, {'name': 'joe', 'age': 12})
         r2 = base.Resource(None, {'name': 'joe', 'age': 12})
         self.assertEqual(r1, r2)
+
+    def test_compact_resource(self):
+        compact_role = base.compact_class(roles.Role)
+        self.assertTrue(base.compact_class(roles.Role) is compact_role)
+        self.assertEqual(compact_role.__name__, 'Role')
+
+        info = {'id': 1, 'name': 'Member', 'OS-KSADM:extra': 'x'}
+        r = compact_role(None, info, loaded=True)
+        self.assertFalse(hasattr(r, '__dict__'))
+        self.assertEqual(r.id, 1)
+        self.assertEqual(r.name, 'Member')
+        self.assertEqual(getattr(r, 'OS-KSADM:extra'), 'x')
+        self.assertEqual(r._info, info)
+        self.assertEqual(repr(r), "<Role %s>" % info)
+        self.assertRaises(AttributeError, getattr, r, 'description')
+
+        r.name = 'Admin'
+        self.assertEqual(r._info['name'], 'Admin')
+        self.assertEqual(r, compact_role(None, {'id': 1}))
+        self.assertNotEqual(r, roles.Role(None, {'id': 1}))
+
+    def test_compact_resource_lazy_getattr(self):
+        self.client.get = self.mox.CreateMockAnything()
+        self.client.get('/OS-KSADM/roles/1').AndReturn(
+            (None, {'role': {'id': 1, 'name': 'Member',
+                             'description': 'desc'}}))
+        self.mox.ReplayAll()
+
+        r = base.compact_class(roles.Role)(self.client.roles, {'id': 1})
+        self.assertEqual(r.description, 'desc')
+        self.assertEqual(r.name, 'Member')
+        self.assertRaises(AttributeError, getattr, r, 'blahblah')
+
+    def test_compact_resources_client(self):
+        cs = client.Client(token='aToken', endpoint='http://127.0.0.1:5000',
+                           compact_resources=True)
+        self.assertEqual(cs.roles.resource_class,
+                         base.compact_class(roles.Role))
+        self.assertEqual(self.client.roles.resource_class, roles.Role)
+
+    def test_prefetch(self):
+        def get(role_id):
+            if role_id == 3:
+                raise exceptions.NotFound(404)
+            return roles.Role(self.client.roles,
+                              {'id': role_id, 'name': 'role%s' % role_id})
+        self.client.roles.get = mock.Mock(side_effect=get)
+
+        loaded = roles.Role(self.client.roles, {'id': 9}, loaded=True)
+        first = roles.Role(self.client.roles, {'id': 1})
+        duplicate = roles.Role(self.client.roles, {'id': 1})
+        second = roles.Role(self.client.roles, {'id': 2})
+        result = base.prefetch(iter([loaded, first, duplicate, second]),
+                               max_workers=2)
+
+        self.assertEqual(result, [loaded, first, duplicate, second])
+        self.assertEqual(self.client.roles.get.call_count, 2)
+        self.assertEqual([r.name for r in result[1:]],
+                         ['role1', 'role1', 'role2'])
+        self.assertTrue(all(r.is_loaded() for r in result))
+
+        missing = roles.Role(self.client.roles, {'id': 3})
+        other = roles.Role(self.client.roles, {'id': 4})
+        self.assertRaises(exceptions.NotFound, base.prefetch,
+                          [missing, other])
+        self.assertEqual(other.name, 'role4')
+        self.assertFalse(missing.is_loaded())
+
+    def test_lazy_loading_disabled(self):
+        cs = client.Client(token='aToken', endpoint='http://127.0.0.1:5000',
+                           lazy_loading=False)
+        cs.roles.get = mock.Mock()
+        r = roles.Role(cs.roles, {'id': 1})
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.assertEqual(getattr(r, 'name', ''), '')
+            compact = base.compact_class(roles.Role)(cs.roles, {'id': 1})
+            self.assertRaises(AttributeError, getattr, compact, 'name')
+
+        self.assertFalse(cs.roles.get.called)
+        self.assertEqual([w.category for w in caught],
+                         [base.LazyLoadWarning] * 2)
+        self.assertEqual(caught[0].filename, __file__.rstrip('c'))
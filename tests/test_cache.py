@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+import time
+
+from keystoneclient import cache
+from tests import utils
+
+
+class LRUCacheTest(utils.TestCase):
+
+    def test_get_set(self):
+        c = cache.LRUCache(max_size=2)
+        c.set('a', 1)
+        self.assertEqual(c.get('a'), 1)
+        self.assertEqual(c.get('b'), None)
+        self.assertEqual(c.get('b', 2), 2)
+        self.assertTrue('a' in c)
+        self.assertFalse('b' in c)
+
+    def test_evicts_least_recently_used(self):
+        c = cache.LRUCache(max_size=2)
+        c.set('a', 1)
+        c.set('b', 2)
+        c.get('a')
+        c.set('c', 3)
+        self.assertEqual(len(c), 2)
+        self.assertFalse('b' in c)
+        self.assertEqual(c.items(), [('a', 1), ('c', 3)])
+
+    def test_expiry(self):
+        c = cache.LRUCache(ttl=10)
+        c.set('a', 1)
+        c.set('b', 2, ttl=100)
+        time.time = lambda: 1250
+        self.assertFalse('a' in c)
+        self.assertEqual(c.get('b'), 2)
+
+    def test_delete_and_clear(self):
+        c = cache.LRUCache()
+        c.set('a', 1)
+        c.set('b', 2)
+        c.delete('a')
+        c.delete('missing')
+        self.assertEqual(c.items(), [('b', 2)])
+        c.clear()
+        self.assertEqual(len(c), 0)
+
+
+class MemoryTokenCacheTest(utils.TestCase):
+
+    def _access(self, token_id, expires):
+        return {'token': {'id': token_id, 'expires': expires}}
+
+    def test_token_key(self):
+        key = cache.token_key('s', 'http://localhost', username='u',
+                              password='p')
+        self.assertEqual(key, cache.token_key('s', 'http://localhost',
+                                              username='u', password='p'))
+        self.assertNotEqual(key, cache.token_key('s', 'http://localhost',
+                                                 username='u', password='x'))
+        # Without the secret, the password can't be checked against a key.
+        self.assertNotEqual(key, cache.token_key('t', 'http://localhost',
+                                                 username='u', password='p'))
+
+    def test_key_secret_per_instance(self):
+        c = cache.MemoryTokenCache()
+        key = c.key('http://localhost', username='u', password='p')
+        self.assertEqual(key, c.key('http://localhost', username='u',
+                                    password='p'))
+        self.assertNotEqual(key, cache.MemoryTokenCache().key(
+            'http://localhost', username='u', password='p'))
+
+    def test_reuses_unexpired_token(self):
+        c = cache.MemoryTokenCache(refresh_margin=60)
+        access = self._access('abc', '1970-01-01T01:00:00Z')
+        c.set('key', access)
+        self.assertEqual(c.get('key'), access)
+
+        # Inside the refresh margin the token is no longer handed out.
+        time.time = lambda: 3600 - 30
+        self.assertEqual(c.get('key'), None)
+
+    def test_skips_expired_and_unparseable_tokens(self):
+        c = cache.MemoryTokenCache()
+        c.set('old', self._access('abc', '1970-01-01T00:00:01Z'))
+        c.set('bad', self._access('def', 'tomorrow'))
+        self.assertEqual(c.get('old'), None)
+        self.assertEqual(c.get('bad'), None)
+
+    def test_invalidate(self):
+        c = cache.MemoryTokenCache()
+        c.set('key', self._access('abc', '1970-01-01T01:00:00Z'))
+        c.invalidate('abc')
+        self.assertEqual(c.get('key'), None)
+
+
+class FileTokenCacheTest(utils.TestCase):
+
+    def setUp(self):
+        super(FileTokenCacheTest, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'cache', 'tokens')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        super(FileTokenCacheTest, self).tearDown()
+
+    def _access(self, token_id, expires='1970-01-01T01:00:00Z'):
+        return {'token': {'id': token_id, 'expires': expires},
+                'serviceCatalog': []}
+
+    def test_shared_between_instances(self):
+        cache.FileTokenCache(self.path).set('key', self._access('abc'))
+        self.assertEqual(os.stat(self.path).st_mode & 0777, 0600)
+
+        other = cache.FileTokenCache(self.path)
+        self.assertEqual(other.get('key'), self._access('abc'))
+        self.assertEqual(other.get('missing'), None)
+
+    def test_key_secret_shared_between_instances(self):
+        key = cache.FileTokenCache(self.path).key('http://localhost',
+                                                  username='u', password='p')
+        self.assertEqual(os.stat(self.path + '.key').st_mode & 0777, 0600)
+        self.assertEqual(key, cache.FileTokenCache(self.path).key(
+            'http://localhost', username='u', password='p'))
+        self.assertEqual(os.listdir(os.path.dirname(self.path)),
+                         ['tokens.key'])
+
+    def test_expired_entries_are_pruned(self):
+        c = cache.FileTokenCache(self.path)
+        c.set('a', self._access('abc', '1970-01-01T00:30:00Z'))
+        c.set('b', self._access('def'))
+
+        time.time = lambda: 1800
+        self.assertEqual(c.get('a'), None)
+        c.set('c', self._access('ghi'))
+        self.assertFalse('abc' in open(self.path).read())
+
+    def test_invalidate(self):
+        c = cache.FileTokenCache(self.path)
+        c.set('a', self._access('abc'))
+        c.set('b', self._access('def'))
+        c.invalidate('abc')
+        self.assertEqual(c.get('a'), None)
+        self.assertEqual(c.get('b'), self._access('def'))
+
+    def test_corrupt_file(self):
+        os.makedirs(os.path.dirname(self.path))
+        open(self.path, 'w').write('not json')
+        c = cache.FileTokenCache(self.path)
+        self.assertEqual(c.get('a'), None)
+        c.set('a', self._access('abc'))
+        self.assertEqual(c.get('a'), self._access('abc'))
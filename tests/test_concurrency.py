@@ -0,0 +1,87 @@
+import threading
+
+import mock
+
+from keystoneclient import concurrency
+from keystoneclient import exceptions
+from tests import utils
+
+
+class WorkerPoolTest(utils.TestCase):
+
+    def test_submit(self):
+        pool = concurrency.WorkerPool(max_workers=2)
+        future = pool.submit(lambda a, b=0: a + b, 1, b=2)
+        self.assertEqual(future.result(), 3)
+        self.assertTrue(future.done())
+        self.assertEqual(future.exception(), None)
+        pool.shutdown()
+
+    def test_exception(self):
+        pool = concurrency.WorkerPool(max_workers=1)
+
+        def fail():
+            raise exceptions.NotFound(404)
+        future = pool.submit(fail)
+        self.assertRaises(exceptions.NotFound, future.result)
+        self.assertTrue(isinstance(future.exception(), exceptions.NotFound))
+        pool.shutdown()
+
+    def test_map_bounded(self):
+        pool = concurrency.WorkerPool(max_workers=3)
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def work(item):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            threading.Event().wait(0.01)
+            with lock:
+                running[0] -= 1
+            return item * 2
+
+        self.assertEqual(pool.map(work, range(10)), range(0, 20, 2))
+        self.assertTrue(running[1] <= 3)
+        pool.shutdown()
+
+    def test_done_callback(self):
+        pool = concurrency.WorkerPool(max_workers=1)
+        future = pool.submit(lambda: 'done')
+        future.result()
+        seen = []
+        future.add_done_callback(seen.append)
+        self.assertEqual(seen, [future])
+        pool.shutdown()
+
+    def test_invalid_size(self):
+        self.assertRaises(ValueError, concurrency.WorkerPool, 0)
+
+
+class RateLimiterTest(utils.TestCase):
+
+    def test_burst_then_rate(self):
+        now = [1000.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        with mock.patch('time.time', lambda: now[0]):
+            with mock.patch('time.sleep', sleep):
+                limiter = concurrency.RateLimiter(2, burst=2)
+                limiter.acquire()
+                limiter.acquire()
+                self.assertEqual(sleeps, [])
+                self.assertFalse(limiter.try_acquire())
+                limiter.acquire()
+                self.assertEqual(sleeps, [0.5])
+                now[0] += 10
+                # Idle time never banks more than the burst.
+                self.assertTrue(limiter.try_acquire())
+                self.assertTrue(limiter.try_acquire())
+                self.assertFalse(limiter.try_acquire())
+
+    def test_invalid_rate(self):
+        self.assertRaises(ValueError, concurrency.RateLimiter, 0)
@@ -1,7 +1,16 @@
+import httplib
+import socket
+import threading
+import time
+
 import httplib2
 import mock
 
+from keystoneclient import cache
 from keystoneclient import client
+from keystoneclient import concurrency
+from keystoneclient import exceptions
+from keystoneclient import retry
 from tests import utils
 
 
@@ -36,7 +45,7 @@ class ClientTest(utils.TestCase):
                        "User-Agent": cl.USER_AGENT,
             }
             mock_request.assert_called_with("http://127.0.0.1:5000/"
-                                            "hi?fresh=1234",
+                                            "hi",
                                             "GET", headers=headers)
             # Automatic JSON parsing
             self.assertEqual(body, {"hi": "there"})
@@ -58,3 +67,453 @@ class ClientTest(utils.TestCase):
                                             headers=headers, body='[1, 2, 3]')
 
         test_post_call()
+
+    def test_reauthenticate_after_unauthorized(self):
+        cl = get_authed_client()
+
+        def authenticate():
+            cl.auth_token = "new_token"
+        cl.authenticate = mock.Mock(side_effect=authenticate)
+
+        unauthorized = (httplib2.Response({"status": 401}), "")
+        responses = [unauthorized, (fake_response, fake_body)] * 2
+        request = mock.Mock(side_effect=responses)
+
+        @mock.patch.object(httplib2.Http, "request", request)
+        def test_retry_call():
+            # A long lived client recovers every time its token expires.
+            for i in range(2):
+                resp, body = cl.post("/hi")
+                self.assertEqual(body, {"hi": "there"})
+            self.assertEqual(cl.authenticate.call_count, 2)
+            headers = {"X-Auth-Token": "new_token",
+                       "User-Agent": cl.USER_AGENT}
+            request.assert_called_with("http://127.0.0.1:5000/hi", "POST",
+                                       headers=headers)
+
+        test_retry_call()
+
+    def test_token_renewal(self):
+        cl = get_authed_client()
+        cl.renew_margin = 60
+        cl.authenticate = mock.Mock()
+
+        with mock.patch('threading.Timer') as timer:
+            cl._schedule_token_renewal(3600)
+            timer.assert_called_with(3600 - 60 - 1234, cl._renew_token,
+                                     args=(3600,))
+            self.assertTrue(timer.return_value.start.called)
+
+            cl._renew_token(3600)
+            self.assertTrue(cl.authenticate.called)
+
+            # Failed renewals are retried while the token is still valid.
+            cl.authenticate.side_effect = exceptions.AuthorizationFailure
+            cl._renew_token(3600)
+            timer.assert_called_with(cl.RENEWAL_RETRY_INTERVAL,
+                                     cl._renew_token, args=(3600,))
+            timer.reset_mock()
+            cl._renew_token(1250)
+            self.assertFalse(timer.called)
+
+            cl.stop_token_renewal()
+            self.assertTrue(timer.return_value.cancel.called)
+
+    def test_renewal_skips_token_cache(self):
+        token_cache = cache.MemoryTokenCache(refresh_margin=60)
+        cl = client.HTTPClient(username="username", password="password",
+                               auth_url="http://auth", token_cache=token_cache,
+                               renew_margin=300)
+        access = {"token": {"id": "token", "expires": "1970-01-01T01:00:00Z"}}
+        token_cache.set("key", access)
+
+        def authenticate():
+            # Like a server re-issuing the same unexpired token.
+            cl.auth_token = "token"
+            cl._schedule_token_renewal(3600)
+        cl.authenticate = mock.Mock(side_effect=authenticate)
+        cl.auth_token = "token"
+
+        with mock.patch('threading.Timer') as timer:
+            cl._renew_token(3600)
+            self.assertEqual(cl.authenticate.call_count, 1)
+            self.assertEqual(token_cache.get("key"), None)
+            # No immediate renewal for the same expiry, only a later retry.
+            timer.assert_called_once_with(cl.RENEWAL_RETRY_INTERVAL,
+                                          cl._renew_token, args=(3600,))
+
+            timer.reset_mock()
+            cl._schedule_token_renewal(7200)
+            timer.assert_called_once_with(7200 - 300 - 1234, cl._renew_token,
+                                          args=(7200,))
+
+    def test_no_renewal_without_margin(self):
+        cl = get_authed_client()
+        with mock.patch('threading.Timer') as timer:
+            cl._schedule_token_renewal(3600)
+            self.assertFalse(timer.called)
+
+    def test_concurrent_reauthentication(self):
+        cl = get_authed_client()
+        # Send every GET, rather than one shared by all the threads.
+        cl.coalesce_requests = False
+        unauthorized = httplib2.Response({"status": 401})
+
+        def request(url, method, headers=None):
+            if headers["X-Auth-Token"] == "token":
+                return unauthorized, ""
+            return fake_response, fake_body
+
+        def authenticate():
+            time.sleep(0.05)
+            cl.auth_token = "new_token"
+        cl.authenticate = mock.Mock(side_effect=authenticate)
+
+        results = []
+
+        def call():
+            results.append(cl.get("/hi")[1])
+
+        with mock.patch.object(httplib2.Http, "request",
+                               mock.Mock(side_effect=request)):
+            threads = [threading.Thread(target=call) for i in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(results, [{"hi": "there"}] * 5)
+        self.assertEqual(cl.authenticate.call_count, 1)
+
+    def test_stream(self):
+        cl = get_authed_client()
+        response = mock.Mock(spec=httplib.HTTPResponse, status=200,
+                             reason='OK', version=11)
+        response.getheaders.return_value = [('content-type',
+                                             'application/json')]
+        response.read.side_effect = ['{"hi": ', '"there"}', '']
+
+        with mock.patch('httplib.HTTPConnection') as connection:
+            connection.return_value.getresponse.return_value = response
+            resp, body = cl.get("/hi?a=b", stream=True)
+            connection.assert_called_with("127.0.0.1:5000", timeout=None)
+            request = connection.return_value.request
+            self.assertEqual(request.call_args[0][:2],
+                             ("GET", "/hi?a=b"))
+            self.assertEqual(resp.status, 200)
+            self.assertEqual("".join(body), fake_body)
+            self.assertTrue(connection.return_value.close.called)
+
+    def test_stream_https_verifies_certificates(self):
+        cl = client.HTTPClient(endpoint="https://127.0.0.1:5000",
+                               token="token")
+        cl.ca_certs = "/etc/keystone/ca.pem"
+        response = mock.Mock(spec=httplib.HTTPResponse, status=200,
+                             reason='OK', version=11)
+        response.getheaders.return_value = []
+        response.read.side_effect = ['{}', '']
+
+        with mock.patch('httplib2.HTTPSConnectionWithTimeout') as connection:
+            connection.return_value.getresponse.return_value = response
+            resp, body = cl.get("/hi", stream=True)
+            connection.assert_called_with(
+                "127.0.0.1:5000", timeout=None,
+                ca_certs="/etc/keystone/ca.pem",
+                disable_ssl_certificate_validation=False)
+            self.assertEqual("".join(body), "{}")
+
+    def test_stream_error(self):
+        cl = get_authed_client()
+        response = mock.Mock(spec=httplib.HTTPResponse, status=404,
+                             reason='Not Found', version=11)
+        response.getheaders.return_value = []
+        response.read.side_effect = ['{"itemNotFound": {"message": "x"}}', '']
+
+        with mock.patch('httplib.HTTPConnection') as connection:
+            connection.return_value.getresponse.return_value = response
+            self.assertRaises(exceptions.NotFound, cl.get, "/hi",
+                              stream=True)
+
+    def test_cache_busting(self):
+        cl = client.HTTPClient(endpoint="http://127.0.0.1:5000",
+                               token="token", cache_busting=True)
+        self.assertEqual(cl.response_cache, None)
+
+        @mock.patch.object(httplib2.Http, "request", mock_request)
+        @mock.patch('time.time', mock.Mock(return_value=1234))
+        def test_get_call():
+            cl.get("/hi")
+            self.assertEqual(mock_request.call_args[0][0],
+                             "http://127.0.0.1:5000/hi?fresh=1234")
+
+        test_get_call()
+
+    def test_conditional_get(self):
+        cl = get_authed_client()
+        tagged = httplib2.Response({"status": 200, "etag": '"v1"'})
+        not_modified = httplib2.Response({"status": 304, "etag": '"v1"'})
+        request = mock.Mock(side_effect=[(tagged, fake_body),
+                                         (not_modified, "")])
+
+        with mock.patch.object(httplib2.Http, "request", request):
+            cl.get("/hi")
+            resp, body = cl.get("/hi")
+
+        self.assertEqual(request.call_args[1]["headers"]["If-None-Match"],
+                         '"v1"')
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(body, {"hi": "there"})
+
+    def test_max_age(self):
+        cl = get_authed_client()
+        cacheable = httplib2.Response({"status": 200,
+                                       "cache-control": "max-age=60"})
+        request = mock.Mock(return_value=(cacheable, fake_body))
+
+        with mock.patch.object(httplib2.Http, "request", request):
+            cl.get("/hi")
+            resp, body = cl.get("/hi")
+            self.assertEqual(request.call_count, 1)
+            self.assertEqual(body, {"hi": "there"})
+
+            # Writes drop cached responses for the resource and its parents.
+            cl.post("/hi/there", body={})
+            cl.get("/hi")
+            self.assertEqual(request.call_count, 3)
+
+    def test_uncacheable_responses(self):
+        cl = get_authed_client()
+        no_store = httplib2.Response({"status": 200, "etag": '"v1"',
+                                      "cache-control": "no-store"})
+        request = mock.Mock(return_value=(no_store, fake_body))
+
+        with mock.patch.object(httplib2.Http, "request", request):
+            cl.get("/hi")
+            cl.get("/hi")
+
+        self.assertEqual(request.call_count, 2)
+        self.assertFalse("If-None-Match" in request.call_args[1]["headers"])
+
+    def test_probe_endpoints(self):
+        cl = get_client()
+        now = [0.0]
+        delays = {"http://near": 0.01, "http://far": 0.2,
+                  "http://broken": 0.01}
+
+        def request(url, timeout):
+            self.assertEqual(timeout, cl.PROBE_TIMEOUT)
+            if url == "http://down":
+                raise socket.error("Connection refused")
+            now[0] += delays[url]
+            status = url == "http://broken" and 500 or 200
+            return httplib2.Response({"status": status}), ""
+
+        with mock.patch.object(cl, "_probe_request", side_effect=request):
+            with mock.patch('time.time', lambda: now[0]):
+                ranked = cl.probe_endpoints(["http://far", "http://down",
+                                             "http://near", "http://broken",
+                                             "http://near"], max_workers=1)
+
+        self.assertEqual([url for url, latency in ranked],
+                         ["http://near", "http://far"])
+        self.assertAlmostEqual(ranked[1][1], 0.2)
+        self.assertEqual(cl.probe_endpoints([]), [])
+
+    def test_probe_timeout(self):
+        cl = get_client()
+        with mock.patch('httplib2.Http') as http:
+            http.return_value.request.return_value = (
+                httplib2.Response({"status": 200}), "")
+            http.return_value.connections = {}
+            cl.probe_endpoints(["http://near"], timeout=2)
+        self.assertEqual(http.call_args[1]["timeout"], 2)
+
+    def test_endpoint_failover(self):
+        cl = client.HTTPClient(token="token",
+                               endpoints=["http://a", "http://b"])
+        self.assertEqual(cl.management_url, "http://a")
+
+        def request(url, method, **kwargs):
+            if url.startswith("http://a"):
+                raise socket.error("Connection refused")
+            return fake_response, fake_body
+
+        with mock.patch.object(cl, "_http_request", side_effect=request):
+            resp, body = cl.get("/hi")
+            self.assertEqual(body, {"hi": "there"})
+            self.assertFalse(cl.endpoints.is_healthy("http://a"))
+            # The failed endpoint is skipped until its cooldown is over.
+            cl.get("/hi")
+            self.assertEqual(cl._http_request.call_count, 3)
+
+    def test_endpoint_failover_exhausted(self):
+        cl = client.HTTPClient(token="token",
+                               endpoints=["http://a", "http://b"])
+        request = mock.Mock(side_effect=socket.timeout("timed out"))
+
+        with mock.patch.object(cl, "_http_request", request):
+            self.assertRaises(socket.timeout, cl.get, "/hi")
+            self.assertEqual(request.call_count, 2)
+            # A POST that timed out may have been processed: no failover.
+            self.assertRaises(socket.timeout, cl.post, "/hi", body={})
+            self.assertEqual(request.call_count, 3)
+
+    def test_retry_policy(self):
+        policy = retry.RetryPolicy(max_retries=2, jitter=False,
+                                   budget=retry.RetryBudget())
+        cl = client.HTTPClient(endpoint="http://127.0.0.1:5000",
+                               token="token", retry_policy=policy)
+        over_limit = httplib2.Response({"status": 413, "retry-after": "3"})
+        unavailable = httplib2.Response({"status": 503})
+        request = mock.Mock(side_effect=[(over_limit, ""),
+                                         (unavailable, ""),
+                                         (fake_response, fake_body)])
+
+        with mock.patch.object(httplib2.Http, "request", request):
+            with mock.patch('time.sleep') as sleep:
+                resp, body = cl.get("/hi")
+        self.assertEqual(body, {"hi": "there"})
+        self.assertEqual(sleep.call_args_list, [((3,), {}), ((1.0,), {})])
+
+    def test_retry_policy_per_call(self):
+        cl = get_authed_client()
+        policy = retry.RetryPolicy(budget=retry.RetryBudget())
+        server_error = httplib2.Response({"status": 500})
+        request = mock.Mock(return_value=(server_error, ""))
+
+        with mock.patch.object(httplib2.Http, "request", request):
+            with mock.patch('time.sleep'):
+                self.assertRaises(exceptions.ClientException, cl.post, "/hi",
+                                  body={}, retry_policy=policy)
+                self.assertEqual(request.call_count, 1)
+                self.assertRaises(exceptions.ClientException, cl.get, "/hi",
+                                  retry_policy=policy)
+                self.assertEqual(request.call_count, 5)
+
+    def test_coalesce_identical_gets(self):
+        cl = get_authed_client()
+        release = threading.Event()
+        calls = []
+
+        def request(*args, **kwargs):
+            calls.append(args)
+            release.wait()
+            return fake_response, fake_body
+
+        waiting = []
+        result = concurrency.Future.result.im_func
+
+        def counting_result(future, timeout=None):
+            waiting.append(future)
+            return result(future, timeout)
+
+        results = []
+
+        def get():
+            results.append(cl.get("/hi")[1])
+
+        with mock.patch.object(httplib2.Http, "request", request):
+            with mock.patch.object(concurrency.Future, "result",
+                                   counting_result):
+                leader = threading.Thread(target=get)
+                leader.start()
+                while not calls:
+                    time.sleep(0.01)
+                followers = [threading.Thread(target=get) for i in range(3)]
+                for thread in followers:
+                    thread.start()
+                while len(waiting) < 3:
+                    time.sleep(0.01)
+                release.set()
+                for thread in [leader] + followers:
+                    thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"hi": "there"}] * 4)
+        # Each caller gets its own copy of the body.
+        self.assertEqual(len(set(id(body) for body in results)), 4)
+        self.assertEqual(cl._inflight, {})
+
+    def test_coalesce_shares_errors(self):
+        cl = get_authed_client()
+        request = mock.Mock(return_value=(httplib2.Response({"status": 404}),
+                                          ""))
+        with mock.patch.object(httplib2.Http, "request", request):
+            self.assertRaises(exceptions.NotFound, cl.get, "/hi")
+        self.assertEqual(cl._inflight, {})
+
+    def test_coalesce_cleans_up_on_interrupt(self):
+        cl = get_authed_client()
+        request = mock.Mock(side_effect=KeyboardInterrupt)
+        with mock.patch.object(httplib2.Http, "request", request):
+            self.assertRaises(KeyboardInterrupt, cl.get, "/hi")
+        self.assertEqual(cl._inflight, {})
+
+
+class ConnectionPoolTest(utils.TestCase):
+
+    def test_reuse(self):
+        pool = client.ConnectionPool(max_idle_per_host=1)
+        cl = get_client()
+        http = pool.get("http://127.0.0.1:5000/v2.0", cl)
+        self.assertTrue(http.force_exception_to_status_code)
+        self.assertEqual(http.timeout, cl.timeout)
+        pool.put("http://127.0.0.1:5000/v2.0", http, cl)
+
+        self.assertTrue(pool.get("http://127.0.0.1:5000/tokens", cl) is http)
+        other = pool.get("http://127.0.0.1:35357/tokens", cl)
+        self.assertFalse(other is http)
+
+    def test_client_state_not_shared(self):
+        pool = client.ConnectionPool()
+        first = get_client()
+        first.add_credentials("user", "secret")
+        first.follow_all_redirects = True
+        http = pool.get("http://localhost/", first)
+        http.authorizations.append(mock.Mock())
+        pool.put("http://localhost/", http, first)
+
+        second = get_client()
+        self.assertTrue(pool.get("http://localhost/", second) is http)
+        self.assertEqual(http.credentials.credentials, [])
+        self.assertEqual(http.authorizations, [])
+        self.assertFalse(http.follow_all_redirects)
+        # The first client's authorizations are kept for it.
+        self.assertEqual(len(first.authorizations), 1)
+
+    def test_idle_bounded_per_host(self):
+        pool = client.ConnectionPool(max_idle_per_host=1)
+        cl = get_client()
+        first = pool.get("http://localhost/", cl)
+        second = pool.get("http://localhost/", cl)
+        second.connections['http:localhost'] = mock.Mock()
+        pool.put("http://localhost/", first, cl)
+        pool.put("http://localhost/", second, cl)
+        self.assertTrue(second.connections == {})
+        self.assertTrue(pool.get("http://localhost/", cl) is first)
+
+    def test_idle_timeout(self):
+        pool = client.ConnectionPool(idle_timeout=10)
+        cl = get_client()
+        http = pool.get("http://localhost/", cl)
+        pool.put("http://localhost/", http, cl)
+        time.time = lambda: 1234 + 11
+        self.assertFalse(pool.get("http://localhost/", cl) is http)
+
+    def test_closed_connections_dropped(self):
+        pool = client.ConnectionPool()
+        cl = get_client()
+        http = pool.get("http://localhost/", cl)
+        ours, theirs = socket.socketpair()
+        conn = mock.Mock(sock=ours)
+        http.connections['http:localhost'] = conn
+        pool.put("http://localhost/", http, cl)
+        self.assertTrue(pool.get("http://localhost/", cl) is http)
+        self.assertTrue('http:localhost' in http.connections)
+
+        theirs.close()
+        pool.put("http://localhost/", http, cl)
+        self.assertTrue(pool.get("http://localhost/", cl) is http)
+        self.assertFalse('http:localhost' in http.connections)
+        self.assertTrue(conn.close.called)
+        ours.close()
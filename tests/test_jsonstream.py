@@ -0,0 +1,54 @@
+import json
+
+from keystoneclient import jsonstream
+from tests import utils
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class IterListTest(utils.TestCase):
+
+    ITEMS = [{"id": 1, "name": "admin", "enabled": True},
+             {"id": 22, "name": u"d\u00e9mo, \"quoted\"", "email": None},
+             {"id": 333, "nested": {"a": [1, 2.5, -3e2]}}]
+
+    def _check(self, body, response_key='users'):
+        data = json.dumps(body)
+        for size in (1, 2, 3, 7, len(data)):
+            items = list(jsonstream.iter_list(chunked(data, size),
+                                              response_key))
+            self.assertEqual(items, self.ITEMS)
+
+    def test_plain_list(self):
+        self._check({"links": [], "users": self.ITEMS})
+
+    def test_values_list(self):
+        self._check({"users": {"links": [{"rel": "next"}],
+                               "values": self.ITEMS}})
+
+    def test_is_lazy(self):
+        data = json.dumps({"users": self.ITEMS})
+        chunks = iter(chunked(data, 5))
+        items = jsonstream.iter_list(chunks, 'users')
+        items.next()
+        self.assertTrue(len(list(chunks)) > 0)
+
+    def test_empty_list(self):
+        self.assertEqual(list(jsonstream.iter_list(['{"users": [ ]}'],
+                                                   'users')), [])
+
+    def test_missing_key(self):
+        self.assertRaises(KeyError, jsonstream.iter_list,
+                          ['{"tenants": []}'], 'users')
+        self.assertRaises(KeyError, jsonstream.iter_list,
+                          ['{"users": {"links": []}}'], 'users')
+
+    def test_invalid(self):
+        items = jsonstream.iter_list(['{"users": [{"id": 1}, {"id"'],
+                                     'users')
+        self.assertEqual(items.next(), {"id": 1})
+        self.assertRaises(ValueError, items.next)
+        self.assertRaises(ValueError, jsonstream.iter_list, ['[1, 2]'],
+                          'users')
@@ -0,0 +1,94 @@
+import httplib2
+import mock
+
+from keystoneclient import metrics
+from keystoneclient.v2_0 import client
+from tests import utils
+
+
+class HistogramTest(utils.TestCase):
+
+    def test_observe(self):
+        histogram = metrics.Histogram(buckets=(1, 0.1))
+        for value in (0.05, 0.5, 0.1, 3):
+            histogram.observe(value)
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 3.65)
+        self.assertEqual(histogram.cumulative(),
+                         [(0.1, 2), (1, 3), (float('inf'), 4)])
+
+
+class MetricsTest(utils.TestCase):
+
+    def test_record_and_snapshot(self):
+        stats = metrics.Metrics(buckets=(0.1, 1))
+        with stats.operation("UserManager.find"):
+            with stats.operation("UserManager.list"):
+                stats.record_request("http://ks:5000/v2.0/users", "GET", 200,
+                                     0.05, bytes_in=100)
+        stats.record_request("http://ks:5000/v2.0/tokens", "POST", 'error',
+                             2, bytes_out=40)
+        stats.record_retry("GET")
+        stats.record_reauthentication()
+
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot['requests'], {
+            ("http://ks:5000", "GET", "UserManager.find", "200"): 1,
+            ("http://ks:5000", "POST", "none", "error"): 1,
+        })
+        latency = snapshot['latency'][("http://ks:5000", "GET",
+                                       "UserManager.find")]
+        self.assertEqual(latency['count'], 1)
+        self.assertEqual(latency['buckets'][0], (0.1, 1))
+        self.assertEqual(snapshot['bytes_in'], {"http://ks:5000": 100})
+        self.assertEqual(snapshot['bytes_out'], {"http://ks:5000": 40})
+        self.assertEqual(snapshot['retries'], {"GET": 1})
+        self.assertEqual(snapshot['reauthentications'], 1)
+
+        stats.reset()
+        self.assertEqual(stats.snapshot()['requests'], {})
+
+    def test_to_prometheus(self):
+        stats = metrics.Metrics(buckets=(0.1,))
+        with stats.operation('Say "hi"'):
+            stats.record_request("http://ks:5000/", "GET", 200, 0.05,
+                                 bytes_in=7)
+        text = stats.to_prometheus()
+        labels = ('endpoint="http://ks:5000",method="GET",'
+                  'operation="Say \\"hi\\""')
+        for line in ['# TYPE keystoneclient_requests_total counter',
+                     'keystoneclient_requests_total{%s,status="200"} 1'
+                     % labels,
+                     '# TYPE keystoneclient_request_duration_seconds '
+                     'histogram',
+                     'keystoneclient_request_duration_seconds_bucket'
+                     '{%s,le="0.1"} 1' % labels,
+                     'keystoneclient_request_duration_seconds_bucket'
+                     '{%s,le="+Inf"} 1' % labels,
+                     'keystoneclient_request_duration_seconds_count{%s} 1'
+                     % labels,
+                     'keystoneclient_response_bytes_total'
+                     '{endpoint="http://ks:5000"} 7',
+                     'keystoneclient_reauthentications_total 0']:
+            self.assertTrue(line in text.splitlines(), line)
+        self.assertTrue(text.endswith('\n'))
+
+    def test_client_instrumented(self):
+        stats = metrics.Metrics()
+        cs = client.Client(token='aToken', endpoint='http://127.0.0.1:5000',
+                           metrics=stats)
+        resp = httplib2.Response({"status": 200})
+        body = '{"user": {"id": 1, "name": "admin"}}'
+        request = mock.Mock(return_value=(resp, body))
+
+        with mock.patch.object(httplib2.Http, "request", request):
+            cs.users.get(1)
+            cs.get("/users/1")
+
+        requests = stats.snapshot()['requests']
+        self.assertEqual(requests, {
+            ("http://127.0.0.1:5000", "GET", "UserManager.get", "200"): 1,
+            ("http://127.0.0.1:5000", "GET", "none", "200"): 1,
+        })
+        self.assertEqual(stats.snapshot()['bytes_in'],
+                         {"http://127.0.0.1:5000": len(body) * 2})
@@ -0,0 +1,37 @@
+import httplib2
+import mock
+
+from keystoneclient import client
+from keystoneclient import ratelimit
+from tests import utils
+
+
+class RequestRateLimiterTest(utils.TestCase):
+
+    def test_separate_buckets(self):
+        limiter = ratelimit.RequestRateLimiter(rate=1, write_rate=2)
+        with mock.patch('time.sleep') as sleep:
+            limiter.acquire("http://a:5000/users", "GET")
+            limiter.acquire("http://a:5000/tenants", "POST")
+            limiter.acquire("http://b:5000/users", "GET")
+            limiter.acquire("https://a:5000/users", "GET")
+            self.assertFalse(sleep.called)
+
+        read = limiter._limiter("http://a:5000/x", "HEAD")
+        write = limiter._limiter("http://a:5000/x", "DELETE")
+        self.assertEqual((read.rate, write.rate), (1, 2))
+        self.assertTrue(read is limiter._limiter("http://a:5000/y", "GET"))
+        self.assertFalse(read.try_acquire())
+        self.assertTrue(write.try_acquire())
+
+    def test_client_throttled(self):
+        limiter = mock.Mock(spec=ratelimit.RequestRateLimiter)
+        cl = client.HTTPClient(endpoint="http://127.0.0.1:5000",
+                               token="token", rate_limiter=limiter)
+        response = httplib2.Response({"status": 200})
+        request = mock.Mock(return_value=(response, '{"hi": "there"}'))
+
+        with mock.patch.object(httplib2.Http, "request", request):
+            cl.get("/hi")
+        limiter.acquire.assert_called_once_with("http://127.0.0.1:5000/hi",
+                                                "GET")
@@ -0,0 +1,100 @@
+import socket
+
+import httplib2
+import mock
+
+from keystoneclient import exceptions
+from keystoneclient import retry
+from tests import utils
+
+
+class RetryPolicyTest(utils.TestCase):
+
+    def setUp(self):
+        super(RetryPolicyTest, self).setUp()
+        self.budget_patcher = mock.patch.object(retry, 'default_budget',
+                                                retry.RetryBudget())
+        self.budget_patcher.start()
+
+    def tearDown(self):
+        self.budget_patcher.stop()
+        super(RetryPolicyTest, self).tearDown()
+
+    def test_is_retryable(self):
+        policy = retry.RetryPolicy()
+        over_limit = exceptions.OverLimit(413)
+        server_error = exceptions.ClientException(500)
+        refused = socket.error("Connection refused")
+
+        self.assertTrue(policy.is_retryable('POST', over_limit))
+        self.assertTrue(policy.is_retryable('GET', server_error))
+        self.assertFalse(policy.is_retryable('POST', server_error))
+        self.assertTrue(policy.is_retryable('DELETE', refused))
+        self.assertFalse(policy.is_retryable('POST', refused))
+        self.assertFalse(policy.is_retryable('GET',
+                                             exceptions.NotFound(404)))
+        self.assertFalse(policy.is_retryable('GET', ValueError()))
+
+    def test_max_retries(self):
+        policy = retry.RetryPolicy(max_retries=2)
+        error = exceptions.OverLimit(413)
+        self.assertTrue(policy.should_retry('GET', error, 1))
+        self.assertFalse(policy.should_retry('GET', error, 2))
+
+    def test_delay(self):
+        policy = retry.RetryPolicy(backoff=1, max_backoff=5, jitter=False)
+        self.assertEqual([policy.delay(i) for i in range(4)], [1, 2, 4, 5])
+
+        error = exceptions.OverLimit(413)
+        error.retry_after = 3
+        self.assertEqual(policy.delay(0, error), 3)
+        # The server's Retry-After is honored even past max_backoff.
+        error.retry_after = 60
+        self.assertEqual(policy.delay(0, error), 60)
+
+        policy.jitter = True
+        with mock.patch('random.uniform', return_value=0.25) as uniform:
+            self.assertEqual(policy.delay(2), 0.25)
+            uniform.assert_called_with(0, 4)
+
+    def test_budget(self):
+        budget = retry.RetryBudget(ratio=0.5, reserve=1)
+        policy = retry.RetryPolicy(budget=budget)
+        error = exceptions.OverLimit(413)
+        self.assertTrue(policy.should_retry('GET', error, 0))
+        self.assertFalse(policy.should_retry('GET', error, 0))
+        policy.record_request()
+        policy.record_request()
+        policy.record_request()
+        # Never more than the reserve is banked.
+        self.assertTrue(policy.should_retry('GET', error, 0))
+        self.assertFalse(policy.should_retry('GET', error, 0))
+
+    def test_max_retry_after(self):
+        policy = retry.RetryPolicy(max_retry_after=60)
+        error = exceptions.OverLimit(413)
+        error.retry_after = 60
+        self.assertTrue(policy.should_retry('GET', error, 0))
+        error.retry_after = 61
+        self.assertFalse(policy.should_retry('GET', error, 0))
+
+    def test_default_budget_shared(self):
+        first = retry.RetryPolicy()
+        second = retry.RetryPolicy()
+        self.assertTrue(first.budget is retry.default_budget)
+        self.assertTrue(second.budget is first.budget)
+
+    def test_retry_after_parsed(self):
+        resp = httplib2.Response({"status": 413, "retry-after": "7"})
+        exc = exceptions.from_response(resp, None)
+        self.assertTrue(isinstance(exc, exceptions.OverLimit))
+        self.assertEqual(exc.retry_after, 7)
+
+        body = {"overLimit": {"message": "Slow down", "retryAfter": "2"}}
+        resp = httplib2.Response({"status": 413})
+        self.assertEqual(exceptions.from_response(resp, body).retry_after, 2)
+
+        resp = httplib2.Response({"status": 413,
+                                  "retry-after": "Fri, 31 Dec 1999"})
+        self.assertEqual(exceptions.from_response(resp, None).retry_after,
+                         None)
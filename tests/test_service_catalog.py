@@ -107,3 +107,51 @@ class ServiceCatalogTest(utils.TestCase):
 
         self.assertRaises(exceptions.EndpointNotFound,
                         sc.url_for, "region", "South", service_type='compute')
+
+    def test_url_for_unknown_attribute(self):
+        sc = service_catalog.ServiceCatalog(SERVICE_CATALOG['access'])
+
+        self.assertRaises(exceptions.EndpointNotFound,
+                          sc.url_for, "zone", "North", service_type='compute')
+        self.assertRaises(exceptions.EndpointNotFound,
+                          sc.url_for, service_type='identity')
+
+    def test_url_for_skips_endpoints_without_type(self):
+        sc = service_catalog.ServiceCatalog({"serviceCatalog": [{
+            "type": "identity",
+            "endpoints": [{"region": "East",
+                           "publicURL": "http://east:5000/v2.0"},
+                          {"region": "West",
+                           "publicURL": "http://west:5000/v2.0",
+                           "adminURL": "http://west:35357/v2.0"}],
+        }]})
+
+        self.assertEquals(sc.url_for(endpoint_type='adminURL'),
+                          "http://west:35357/v2.0")
+        self.assertEquals(sc.url_for(endpoint_type='adminURL'),
+                          sc.url_map(endpoint_type='adminURL')['identity'])
+        self.assertRaises(exceptions.EndpointNotFound, sc.url_for,
+                          'region', 'East', endpoint_type='adminURL')
+        self.assertEquals(sc.url_for('region', 'East'),
+                          "http://east:5000/v2.0")
+
+    def test_url_map(self):
+        sc = service_catalog.ServiceCatalog(SERVICE_CATALOG['access'])
+
+        files_url = "https://compute.north.host/v1/blah-blah"
+        self.assertEquals(sc.url_map(),
+                          {'compute': "https://compute.north.host/v1/1234",
+                           'object-store': files_url})
+        self.assertEquals(sc.url_map(region='South',
+                                     endpoint_type='internalURL'),
+                          {'object-store': files_url})
+        self.assertEquals(sc.url_map(region='East'), {})
+
+    def test_get_endpoints(self):
+        sc = service_catalog.ServiceCatalog(SERVICE_CATALOG['access'])
+
+        endpoints = sc.get_endpoints(service_type='object-store')
+        self.assertEquals([e['tenantId'] for e in endpoints], ['11', '2'])
+        self.assertEquals(sc.get_endpoints(service_type='object-store',
+                                           endpoint_type='adminURL'), [])
+        self.assertEquals(sc.get_endpoints(), [])
@@ -37,3 +37,11 @@ class ShellTest(utils.TestCase):
         httplib2.debuglevel = 0
         shell('--debug help')
         assert httplib2.debuglevel == 1
+
+    def test_os_cache_env(self):
+        for value, expected in (('', False), ('0', False), ('false', False),
+                                ('no', False), ('1', True), ('True', True)):
+            os.environ['OS_CACHE'] = value
+            parser = _shell.get_base_parser()
+            args = parser.parse_known_args([])[0]
+            self.assertEqual(args.os_cache, expected, value)
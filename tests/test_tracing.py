@@ -0,0 +1,119 @@
+import logging
+
+import httplib2
+import mock
+
+from keystoneclient import client
+from keystoneclient import tracing
+from tests import utils
+
+
+class TracerTest(utils.TestCase):
+
+    def test_event(self):
+        events = []
+        tracer = tracing.Tracer(sink=events.append)
+        body = '{"auth": {"passwordCredentials": {"password": "pw"}}}'
+        response = '{"access": {"token": {"id": "abc", "expires": "x"}}}'
+        tracer.trace("POST", "http://ks/v2.0/tokens",
+                     {"X-Auth-Token": "abc", "User-Agent": "ua"},
+                     body, 200, 0.25, response)
+
+        event = events[0]
+        self.assertEqual(event['method'], "POST")
+        self.assertEqual(event['status'], 200)
+        self.assertEqual(event['duration'], 0.25)
+        self.assertEqual(event['request_bytes'], len(body))
+        self.assertEqual(event['response_bytes'], len(response))
+        self.assertEqual(event['request_headers'],
+                         {"X-Auth-Token": tracing.REDACTED,
+                          "User-Agent": "ua"})
+        self.assertFalse('"pw"' in event['request_body'])
+        self.assertFalse('"abc"' in event['response_body'])
+        self.assertTrue('"expires": "x"' in event['response_body'])
+
+    def test_token_url_redacted(self):
+        events = []
+        tracer = tracing.Tracer(sink=events.append)
+        tracer.trace("GET", "http://ks/v2.0/tokens/abc?belongsTo=t1", None,
+                     None, 200, 0, None)
+        tracer.trace("GET", "http://ks/v2.0/tokens/abc/endpoints", None,
+                     None, 200, 0, None)
+        tracer.trace("POST", "http://ks/v2.0/tokens", None, None, 200, 0,
+                     None)
+        self.assertEqual([e['url'] for e in events],
+                         ["http://ks/v2.0/tokens/%s?belongsTo=t1"
+                          % tracing.REDACTED,
+                          "http://ks/v2.0/tokens/%s/endpoints"
+                          % tracing.REDACTED,
+                          "http://ks/v2.0/tokens"])
+
+    def test_bodies_bounded(self):
+        events = []
+        tracer = tracing.Tracer(max_body=10, max_parse=100,
+                                sink=events.append)
+        tracer.trace("GET", "http://ks/", None, None, 200, 0, "x" * 50)
+        tracer.trace("GET", "http://ks/", None, None, 200, 0, "x" * 500)
+        tracer.trace("GET", "http://ks/", None, None, 200, 0, iter([]))
+        self.assertEqual([e['response_body'] for e in events],
+                         ["x" * 10 + "...<40 more>", "<500 bytes>",
+                          "<streamed>"])
+        self.assertEqual(events[0]['request_body'], None)
+
+    def test_sampling(self):
+        tracer = tracing.Tracer(sample_rate=0.25)
+        with mock.patch('random.random', return_value=0.5):
+            self.assertFalse(tracer.sampled())
+        with mock.patch('random.random', return_value=0.1):
+            self.assertTrue(tracer.sampled())
+
+    def test_failing_sink(self):
+        tracer = tracing.Tracer(sink=mock.Mock(side_effect=ValueError))
+        tracer.trace("GET", "http://ks/", None, None, 200, 0, None)
+
+    def test_debug_logging_single_handler(self):
+        logger = logging.getLogger('keystoneclient.client')
+        level = logger.level
+        try:
+            with mock.patch.dict('os.environ', {'KEYSTONECLIENT_DEBUG': '1'}):
+                client.HTTPClient()
+                client.HTTPClient()
+            handlers = [h for h in logger.handlers
+                        if h is tracing._debug_handler]
+            self.assertEqual(len(handlers), 1)
+        finally:
+            logger.removeHandler(tracing._debug_handler)
+            tracing._debug_handler = None
+            logger.setLevel(level)
+
+
+class ClientTracingTest(utils.TestCase):
+
+    def test_client_traces_requests(self):
+        events = []
+        cl = client.HTTPClient(endpoint="http://127.0.0.1:5000",
+                               token="token",
+                               tracer=tracing.Tracer(sink=events.append))
+        resp = httplib2.Response({"status": 404})
+        request = mock.Mock(return_value=(resp, '{"error": {}}'))
+
+        with mock.patch.object(httplib2.Http, "request", request):
+            self.assertRaises(Exception, cl.get, "/hi")
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['url'], "http://127.0.0.1:5000/hi")
+        self.assertEqual(events[0]['status'], 404)
+        self.assertEqual(events[0]['request_headers']['X-Auth-Token'],
+                         tracing.REDACTED)
+
+    def test_debug_logger_traces(self):
+        cl = client.HTTPClient()
+        logger = logging.getLogger('keystoneclient.client')
+        level = logger.level
+        try:
+            logger.setLevel(logging.INFO)
+            self.assertEqual(cl._get_tracer(), None)
+            logger.setLevel(logging.DEBUG)
+            self.assertEqual(cl._get_tracer(), tracing.default_tracer)
+        finally:
+            logger.setLevel(level)
@@ -62,3 +62,21 @@ class FindResourceTestCase(test_utils.TestCase):
     def test_find_by_int_name(self):
         output = utils.find_resource(self.manager, 9876)
         self.assertEqual(output, self.manager.resources['5678'])
+
+
+class ParseIsotimeTestCase(test_utils.TestCase):
+
+    def test_parse_utc(self):
+        self.assertEqual(utils.parse_isotime('1970-01-01T01:00:00Z'), 3600)
+        self.assertEqual(utils.parse_isotime('1970-01-01T01:00:00'), 3600)
+        self.assertEqual(utils.parse_isotime('1970-01-01T01:00:00.123456Z'),
+                         3600)
+
+    def test_parse_offset(self):
+        self.assertEqual(utils.parse_isotime('2010-11-01T03:32:15-05:00'),
+                         utils.parse_isotime('2010-11-01T08:32:15Z'))
+        self.assertEqual(utils.parse_isotime('1970-01-01T02:00:00+0100'),
+                         3600)
+
+    def test_parse_invalid(self):
+        self.assertRaises(ValueError, utils.parse_isotime, '12345')
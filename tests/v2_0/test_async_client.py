@@ -0,0 +1,82 @@
+import json
+import urlparse
+
+import httplib2
+import mock
+
+from keystoneclient import concurrency
+from keystoneclient import exceptions
+from keystoneclient import metrics
+from keystoneclient.v2_0 import async_client
+from keystoneclient.v2_0 import client
+from keystoneclient.v2_0 import roles
+from tests import utils
+
+
+class AsyncClientTests(utils.TestCase):
+    def setUp(self):
+        super(AsyncClientTests, self).setUp()
+        self.TEST_REQUEST_HEADERS = {'X-Auth-Token': 'aToken',
+                                     'User-Agent': 'python-keystoneclient'}
+        self.keystone = async_client.AsyncClient(self.client, max_workers=2)
+
+    def tearDown(self):
+        self.keystone.close()
+        super(AsyncClientTests, self).tearDown()
+
+    def test_get(self):
+        resp = httplib2.Response({
+            "status": 200,
+            "body": json.dumps({'role': {'id': 1, 'name': 'admin'}}),
+            })
+        httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
+                              'v2.0/OS-KSADM/roles/1'),
+                              'GET',
+                              headers=self.TEST_REQUEST_HEADERS) \
+                              .AndReturn((resp, resp['body']))
+        self.mox.ReplayAll()
+
+        future = self.keystone.roles.get(1)
+        self.assertTrue(isinstance(future, concurrency.Future))
+        role = future.result()
+        self.assertTrue(isinstance(role, roles.Role))
+        self.assertEqual(role.name, 'admin')
+
+    def test_error(self):
+        resp = httplib2.Response({
+            "status": 404,
+            "body": json.dumps({'itemNotFound': {'message': 'Not found'}}),
+            })
+        httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
+                              'v2.0/tenants/1'),
+                              'GET',
+                              headers=self.TEST_REQUEST_HEADERS) \
+                              .AndReturn((resp, resp['body']))
+        self.mox.ReplayAll()
+
+        future = self.keystone.tenants.get(1)
+        self.assertRaises(exceptions.NotFound, future.result)
+
+    def test_attributes_pass_through(self):
+        self.assertEqual(self.keystone.roles.resource_class, roles.Role)
+        self.assertTrue(self.keystone.client is self.client)
+
+    def test_metrics(self):
+        stats = metrics.Metrics()
+        cs = client.Client(token='aToken', endpoint='http://127.0.0.1:5000',
+                           metrics=stats)
+        keystone = async_client.AsyncClient(cs, max_workers=1)
+        resp = httplib2.Response({"status": 200})
+        body = '{"role": {"id": 1, "name": "admin"}}'
+        request = mock.Mock(return_value=(resp, body))
+
+        try:
+            with mock.patch.object(httplib2.Http, "request", request):
+                future = keystone.roles.get(1)
+                self.assertTrue(isinstance(future, concurrency.Future))
+                self.assertEqual(future.result().name, 'admin')
+        finally:
+            keystone.close()
+        self.assertEqual(stats.snapshot()['requests'], {
+            ("http://127.0.0.1:5000", "GET", "RoleManager.get", "200"): 1,
+        })
@@ -1,6 +1,9 @@
 import httplib2
 import json
 
+import mock
+
+from keystoneclient import cache
 from keystoneclient.v2_0 import client
 from keystoneclient import exceptions
 from tests import utils
@@ -53,12 +56,7 @@ class AuthenticateAgainstKeystoneTests(utils.TestCase):
                                 "message": "Unauthorized", "code": "401"}}),
             })
 
-        # Implicit retry on API calls, so it gets called twice
-        httplib2.Http.request(self.TEST_URL + "/tokens",
-                              'POST',
-                              body=json.dumps(self.TEST_REQUEST_BODY),
-                              headers=self.TEST_REQUEST_HEADERS) \
-                              .AndReturn((resp, resp['body']))
+        # A failed authentication isn't retried.
         httplib2.Http.request(self.TEST_URL + "/tokens",
                               'POST',
                               body=json.dumps(self.TEST_REQUEST_BODY),
@@ -201,3 +199,100 @@ class AuthenticateAgainstKeystoneTests(utils.TestCase):
         self.assertEqual(cs.auth_token,
                          self.TEST_RESPONSE_DICT["access"]["token"]["id"])
         self.assertFalse('serviceCatalog' in cs.service_catalog.catalog)
+
+    def test_authenticate_reuses_cached_token(self):
+        self.TEST_RESPONSE_DICT['access']['token']['expires'] = \
+                '1970-01-02T00:00:00Z'
+        resp = httplib2.Response({
+            "status": 200,
+            "body": json.dumps(self.TEST_RESPONSE_DICT),
+            })
+
+        # Only the first client should hit the server.
+        httplib2.Http.request(self.TEST_URL + "/tokens",
+                              'POST',
+                              body=json.dumps(self.TEST_REQUEST_BODY),
+                              headers=self.TEST_REQUEST_HEADERS) \
+                              .AndReturn((resp, resp['body']))
+        self.mox.ReplayAll()
+
+        token_cache = cache.MemoryTokenCache()
+        for i in range(2):
+            cs = client.Client(username=self.TEST_USER,
+                               password=self.TEST_TOKEN,
+                               tenant_id=self.TEST_TENANT_ID,
+                               auth_url=self.TEST_URL,
+                               token_cache=token_cache)
+            self.assertEqual(cs.auth_token, self.TEST_TOKEN)
+            self.assertEqual(cs.management_url,
+                             self.TEST_SERVICE_CATALOG[3]['endpoints'][0]
+                                 ['adminURL'])
+
+    def test_reauthenticate_once_per_rejected_request(self):
+        unauthorized = httplib2.Response({
+            "status": 401,
+            "body": json.dumps({"unauthorized": {
+                                "message": "Unauthorized", "code": "401"}}),
+            })
+        httplib2.Http.request(self.TEST_URL + "/users",
+                              'GET',
+                              headers={'X-Auth-Token': self.TEST_TOKEN,
+                                       'User-Agent':
+                                           'python-keystoneclient'}) \
+                              .AndReturn((unauthorized, unauthorized['body']))
+        # The token is refused again: that is raised, not re-authenticated.
+        headers = dict(self.TEST_REQUEST_HEADERS)
+        headers['X-Auth-Token'] = self.TEST_TOKEN
+        httplib2.Http.request(self.TEST_URL + "/tokens",
+                              'POST',
+                              body=json.dumps({"auth": {"token": {
+                                  "id": self.TEST_TOKEN}}}),
+                              headers=headers) \
+                              .AndReturn((unauthorized, unauthorized['body']))
+        self.mox.ReplayAll()
+
+        cs = client.Client(token=self.TEST_TOKEN, endpoint=self.TEST_URL)
+        self.assertRaises(exceptions.Unauthorized, cs.users.list)
+
+
+class FastestEndpointTests(utils.TestCase):
+
+    def _access(self):
+        return {
+            "token": {"id": self.TEST_TOKEN,
+                      "expires": "1970-01-02T00:00:00Z"},
+            "serviceCatalog": [{
+                "type": "identity",
+                "name": "keystone",
+                "endpoints": [{"region": "East",
+                               "adminURL": "http://east:35357/v2.0"},
+                              {"region": "West",
+                               "adminURL": "http://west:35357/v2.0"}],
+            }],
+        }
+
+    def test_fastest_selected_once_per_catalog(self):
+        cs = client.Client(token=self.TEST_TOKEN, endpoint=self.TEST_URL,
+                           select_fastest_endpoint=True)
+        cs.probe_endpoints = mock.Mock(return_value=[
+            ("http://west:35357/v2.0", 0.01),
+            ("http://east:35357/v2.0", 0.2)])
+
+        cs._extract_service_catalog(self.TEST_URL, self._access())
+        self.assertEqual(cs.management_url, "http://west:35357/v2.0")
+        cs.probe_endpoints.assert_called_once_with(
+            ("http://east:35357/v2.0", "http://west:35357/v2.0"))
+
+        # Renewing with the same catalog doesn't probe again.
+        cs._extract_service_catalog(self.TEST_URL, self._access())
+        self.assertEqual(cs.management_url, "http://west:35357/v2.0")
+        self.assertEqual(cs.probe_endpoints.call_count, 1)
+
+    def test_no_healthy_endpoint(self):
+        cs = client.Client(token=self.TEST_TOKEN, endpoint=self.TEST_URL,
+                           select_fastest_endpoint=True)
+        cs.probe_endpoints = mock.Mock(return_value=[])
+
+        cs._extract_service_catalog(self.TEST_URL, self._access())
+        # The catalog's first identity endpoint is used.
+        self.assertEqual(cs.management_url, "http://east:35357/v2.0")
@@ -2,8 +2,11 @@ import urlparse
 import json
 
 import httplib2
+import mock
 
+from keystoneclient import exceptions
 from keystoneclient.v2_0 import roles
+from keystoneclient.v2_0 import users
 from tests import utils
 
 
@@ -72,7 +75,7 @@ class RoleTests(utils.TestCase):
                                 self.TEST_ROLES['roles']['values'][0]}),
             })
         httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
-                              'v2.0/OS-KSADM/roles/1?fresh=1234'),
+                              'v2.0/OS-KSADM/roles/1'),
                               'GET',
                               headers=self.TEST_REQUEST_HEADERS) \
                               .AndReturn((resp, resp['body']))
@@ -90,7 +93,7 @@ class RoleTests(utils.TestCase):
             })
 
         httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
-                              'v2.0/OS-KSADM/roles?fresh=1234'),
+                              'v2.0/OS-KSADM/roles'),
                               'GET',
                               headers=self.TEST_REQUEST_HEADERS) \
                               .AndReturn((resp, resp['body']))
@@ -98,3 +101,130 @@ class RoleTests(utils.TestCase):
 
         role_list = self.client.roles.list()
         [self.assertTrue(isinstance(r, roles.Role)) for r in role_list]
+
+    def test_list_cache(self):
+        self.client.roles.enable_list_cache(ttl=60)
+        list_resp = httplib2.Response({
+            "status": 200,
+            "body": json.dumps(self.TEST_ROLES),
+            })
+        create_resp = httplib2.Response({
+            "status": 200,
+            "body": json.dumps({"role": {"name": "sysadmin", "id": 3}}),
+            })
+
+        httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
+                              'v2.0/OS-KSADM/roles'),
+                              'GET',
+                              headers=self.TEST_REQUEST_HEADERS) \
+                              .AndReturn((list_resp, list_resp['body']))
+        httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
+                              'v2.0/OS-KSADM/roles'),
+                              'POST',
+                              body=json.dumps({"role": {"name": "sysadmin"}}),
+                              headers=self.TEST_POST_HEADERS) \
+                              .AndReturn((create_resp, create_resp['body']))
+        httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
+                              'v2.0/OS-KSADM/roles'),
+                              'GET',
+                              headers=self.TEST_REQUEST_HEADERS) \
+                              .AndReturn((list_resp, list_resp['body']))
+        self.mox.ReplayAll()
+
+        role_list = self.client.roles.list()
+        role_list[0].name = 'changed'
+        # Served from the cache, unaffected by changes to earlier results.
+        role_list = self.client.roles.list()
+        self.assertEqual([r.name for r in role_list], ['admin', 'member'])
+
+        # Creating a role empties the cache.
+        self.client.roles.create('sysadmin')
+        role_list = self.client.roles.list()
+        self.assertEqual(len(role_list), 2)
+
+    def test_list_cache_kept_on_grants(self):
+        self.client.roles.enable_list_cache(ttl=60)
+        resp = httplib2.Response({
+            "status": 200,
+            "body": json.dumps(self.TEST_ROLES),
+            })
+        for _ in range(2):
+            httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
+                                  'v2.0/OS-KSADM/roles'),
+                                  'GET',
+                                  headers=self.TEST_REQUEST_HEADERS) \
+                                  .AndReturn((resp, resp['body']))
+        self.mox.ReplayAll()
+
+        self.client.put = mock.Mock(return_value=(None, None))
+        self.client.delete = mock.Mock(return_value=(None, None))
+        self.client.roles.list()
+        # Granting a role changes the user's roles, not the list of roles.
+        self.client.roles.add_user_role('foo', 1, 'bar')
+        self.client.roles.remove_user_role('foo', 1)
+        self.client.roles.list()
+        # Deleting one does, so the list is fetched again.
+        self.client.roles.delete(1)
+        self.client.roles.list()
+
+    def test_list_cache_skips_roles_for_user(self):
+        self.client.roles.enable_list_cache(ttl=60)
+        resp = httplib2.Response({
+            "status": 200,
+            "body": json.dumps(self.TEST_ROLES),
+            })
+        for _ in range(2):
+            httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
+                                  'v2.0/users/foo/roles'),
+                                  'GET',
+                                  headers=self.TEST_REQUEST_HEADERS) \
+                                  .AndReturn((resp, resp['body']))
+        self.mox.ReplayAll()
+
+        # A user's roles change as grants are made by other managers, so
+        # they are always fetched.
+        self.client.roles.roles_for_user('foo')
+        self.client.roles.roles_for_user('foo')
+
+    def test_roles_for_users(self):
+        user = users.User(None, {"id": "u1"}, loaded=True)
+
+        def roles_for_user(user, tenant=None):
+            return ["%s:%s" % (user, tenant)]
+        self.client.roles.roles_for_user = mock.Mock(
+            side_effect=roles_for_user)
+
+        result = self.client.roles.roles_for_users([(user, "t1"),
+                                                    ("u1", "t1"),
+                                                    ("u2", None)],
+                                                   max_workers=2)
+        self.assertEqual(result, {("u1", "t1"): ["u1:t1"],
+                                  ("u2", None): ["u2:None"]})
+        self.assertEqual(self.client.roles.roles_for_user.call_count, 2)
+
+    def test_add_user_roles(self):
+        def add_user_role(user, role, tenant=None):
+            if user == "bad":
+                raise exceptions.NotFound(404)
+        self.client.roles.add_user_role = mock.Mock(side_effect=add_user_role)
+
+        grants = [("u1", "r1", "t1"), ("bad", "r1", "t1"), ("u2", "r2", None)]
+        results = self.client.roles.add_user_roles(grants, max_workers=2,
+                                                   rate=100)
+        self.assertEqual([grant for grant, error in results], grants)
+        errors = [error for grant, error in results]
+        self.assertEqual(errors[0], None)
+        self.assertTrue(isinstance(errors[1], exceptions.NotFound))
+        self.assertEqual(errors[2], None)
+        self.assertEqual(self.client.roles.add_user_role.call_count, 3)
+
+    def test_remove_user_roles_malformed_grant(self):
+        self.client.roles.remove_user_role = mock.Mock()
+
+        grants = [("u1", "r1"), ("u2", "r2", None)]
+        results = self.client.roles.remove_user_roles(grants)
+        errors = [error for grant, error in results]
+        self.assertTrue(isinstance(errors[0], ValueError))
+        self.assertEqual(errors[1], None)
+        self.client.roles.remove_user_role.assert_called_once_with(
+            "u2", "r2", None)
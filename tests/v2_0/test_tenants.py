@@ -3,6 +3,7 @@ import json
 
 import httplib2
 
+from keystoneclient import exceptions
 from keystoneclient.v2_0 import tenants
 from tests import utils
 
@@ -89,7 +90,7 @@ class TenantTests(utils.TestCase):
                 self.TEST_TENANTS['tenants']['values'][2]}),
             })
         httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
-                              'v2.0/tenants/1?fresh=1234'),
+                              'v2.0/tenants/1'),
                               'GET',
                               headers=self.TEST_REQUEST_HEADERS) \
                               .AndReturn((resp, resp['body']))
@@ -107,7 +108,7 @@ class TenantTests(utils.TestCase):
             })
 
         httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
-                              'v2.0/tenants?fresh=1234'),
+                              'v2.0/tenants'),
                               'GET',
                               headers=self.TEST_REQUEST_HEADERS) \
                               .AndReturn((resp, resp['body']))
@@ -123,7 +124,7 @@ class TenantTests(utils.TestCase):
             })
 
         httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
-                              'v2.0/tenants?limit=1&fresh=1234'),
+                              'v2.0/tenants?limit=1'),
                               'GET',
                               headers=self.TEST_REQUEST_HEADERS) \
                               .AndReturn((resp, resp['body']))
@@ -139,7 +140,7 @@ class TenantTests(utils.TestCase):
             })
 
         httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
-                              'v2.0/tenants?marker=1&fresh=1234'),
+                              'v2.0/tenants?marker=1'),
                               'GET',
                               headers=self.TEST_REQUEST_HEADERS) \
                               .AndReturn((resp, resp['body']))
@@ -155,7 +156,7 @@ class TenantTests(utils.TestCase):
             })
 
         httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
-                              'v2.0/tenants?marker=1&limit=1&fresh=1234'),
+                              'v2.0/tenants?marker=1&limit=1'),
                               'GET',
                               headers=self.TEST_REQUEST_HEADERS) \
                               .AndReturn((resp, resp['body']))
@@ -164,6 +165,84 @@ class TenantTests(utils.TestCase):
         tenant_list = self.client.tenants.list(limit=1, marker=1)
         [self.assertTrue(isinstance(t, tenants.Tenant)) for t in tenant_list]
 
+    def _expect_pages(self):
+        values = self.TEST_TENANTS['tenants']['values']
+        pages = [('limit=2', values[:2]), ('marker=2&limit=2', values[2:])]
+        for query, page in pages:
+            resp = httplib2.Response({
+                "status": 200,
+                "body": json.dumps({"tenants": {"values": page}}),
+                })
+            httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
+                                  'v2.0/tenants?%s' % query),
+                                  'GET',
+                                  headers=self.TEST_REQUEST_HEADERS) \
+                                  .AndReturn((resp, resp['body']))
+        self.mox.ReplayAll()
+
+    def test_iter_all(self):
+        self._expect_pages()
+
+        tenant_iter = self.client.tenants.iter_all(page_size=2)
+        self.assertEqual([t.id for t in tenant_iter], [3, 2, 1])
+
+    def test_iter_all_prefetch(self):
+        self._expect_pages()
+
+        tenant_iter = self.client.tenants.iter_all(page_size=2,
+                                                   prefetch=True)
+        tenant = tenant_iter.next()
+        self.assertTrue(isinstance(tenant, tenants.Tenant))
+        self.assertEqual([tenant.id] + [t.id for t in tenant_iter],
+                         [3, 2, 1])
+
+    def test_iter_all_ignored_marker(self):
+        values = self.TEST_TENANTS['tenants']['values'][:2]
+        resp = httplib2.Response({
+            "status": 200,
+            "body": json.dumps({"tenants": {"values": values}}),
+            })
+        for query in ('limit=2', 'marker=2&limit=2'):
+            httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
+                                  'v2.0/tenants?%s' % query),
+                                  'GET',
+                                  headers=self.TEST_REQUEST_HEADERS) \
+                                  .AndReturn((resp, resp['body']))
+        self.mox.ReplayAll()
+
+        tenant_iter = self.client.tenants.iter_all(page_size=2)
+        self.assertEqual([t.id for t in tenant_iter], [3, 2])
+
+    def test_find_by_name_not_found(self):
+        resp = httplib2.Response({
+            "status": 404,
+            "body": json.dumps({"itemNotFound": {"message": "Not found"}}),
+            })
+        httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
+                              'v2.0/tenants?name=nobody'),
+                              'GET',
+                              headers=self.TEST_REQUEST_HEADERS) \
+                              .AndReturn((resp, resp['body']))
+        self.mox.ReplayAll()
+
+        self.assertRaises(exceptions.NotFound, self.client.tenants.find,
+                          name='nobody')
+
+    def test_find_client_side(self):
+        resp = httplib2.Response({
+            "status": 200,
+            "body": json.dumps(self.TEST_TENANTS),
+            })
+        httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
+                              'v2.0/tenants'),
+                              'GET',
+                              headers=self.TEST_REQUEST_HEADERS) \
+                              .AndReturn((resp, resp['body']))
+        self.mox.ReplayAll()
+
+        tenant = self.client.tenants.find(description='None')
+        self.assertEqual(tenant.id, 2)
+
     def test_update(self):
         req_body = {"tenant": {"id": 4,
                                "name": "tenantX",
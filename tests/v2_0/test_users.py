@@ -2,7 +2,9 @@ import urlparse
 import json
 
 import httplib2
+import mock
 
+from keystoneclient import exceptions
 from keystoneclient.v2_0 import users
 from tests import utils
 
@@ -87,7 +89,7 @@ class UserTests(utils.TestCase):
             "body": json.dumps({'user': self.TEST_USERS['users']['values'][0]})
             })
         httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
-                              'v2.0/users/1?fresh=1234'),
+                              'v2.0/users/1'),
                               'GET',
                               headers=self.TEST_REQUEST_HEADERS) \
                               .AndReturn((resp, resp['body']))
@@ -105,7 +107,7 @@ class UserTests(utils.TestCase):
             })
 
         httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
-                              'v2.0/users?fresh=1234'),
+                              'v2.0/users'),
                               'GET',
                               headers=self.TEST_REQUEST_HEADERS) \
                               .AndReturn((resp, resp['body']))
@@ -121,7 +123,7 @@ class UserTests(utils.TestCase):
             })
 
         httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
-                              'v2.0/users?limit=1&fresh=1234'),
+                              'v2.0/users?limit=1'),
                               'GET',
                               headers=self.TEST_REQUEST_HEADERS) \
                               .AndReturn((resp, resp['body']))
@@ -137,7 +139,7 @@ class UserTests(utils.TestCase):
             })
 
         httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
-                              'v2.0/users?marker=1&fresh=1234'),
+                              'v2.0/users?marker=1'),
                               'GET',
                               headers=self.TEST_REQUEST_HEADERS) \
                               .AndReturn((resp, resp['body']))
@@ -153,7 +155,7 @@ class UserTests(utils.TestCase):
             })
 
         httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
-                              'v2.0/users?marker=1&limit=1&fresh=1234'),
+                              'v2.0/users?marker=1&limit=1'),
                               'GET',
                               headers=self.TEST_REQUEST_HEADERS) \
                               .AndReturn((resp, resp['body']))
@@ -162,6 +164,98 @@ class UserTests(utils.TestCase):
         user_list = self.client.users.list(limit=1, marker=1)
         [self.assertTrue(isinstance(u, users.User)) for u in user_list]
 
+    def test_iter_all(self):
+        values = self.TEST_USERS['users']['values']
+        pages = [('limit=1', values[:1]), ('marker=1&limit=1', values[1:]),
+                 ('marker=2&limit=1', [])]
+        for query, page in pages:
+            resp = httplib2.Response({
+                "status": 200,
+                "body": json.dumps({"users": {"values": page}}),
+                })
+            httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
+                                  'v2.0/tenants/3/users?%s' %
+                                  query),
+                                  'GET',
+                                  headers=self.TEST_REQUEST_HEADERS) \
+                                  .AndReturn((resp, resp['body']))
+        self.mox.ReplayAll()
+
+        user_iter = self.client.users.iter_all(tenant_id=3, page_size=1)
+        self.assertEqual([u.name for u in user_iter], ['admin', 'demo'])
+
+    def test_iter_all_uuid_marker(self):
+        values = [{"id": "a1b2c3d4e5f6", "name": "admin"},
+                  {"id": "f6e5d4c3b2a1", "name": "demo"}]
+        pages = [('limit=1', values[:1]),
+                 ('marker=a1b2c3d4e5f6&limit=1', values[1:]),
+                 ('marker=f6e5d4c3b2a1&limit=1', [])]
+        for query, page in pages:
+            resp = httplib2.Response({
+                "status": 200,
+                "body": json.dumps({"users": {"values": page}}),
+                })
+            httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
+                                  'v2.0/users?%s' % query),
+                                  'GET',
+                                  headers=self.TEST_REQUEST_HEADERS) \
+                                  .AndReturn((resp, resp['body']))
+        self.mox.ReplayAll()
+
+        user_iter = self.client.users.iter_all(page_size=1)
+        self.assertEqual([u.name for u in user_iter], ['admin', 'demo'])
+
+    def test_list_stream(self):
+        body = json.dumps(self.TEST_USERS)
+        chunks = [body[i:i + 10] for i in range(0, len(body), 10)]
+        self.client._stream_request = self.mox.CreateMockAnything()
+        self.client._stream_request(urlparse.urljoin(self.TEST_URL,
+                                    'v2.0/users'),
+                                    'GET',
+                                    headers=self.TEST_REQUEST_HEADERS) \
+                                    .AndReturn((httplib2.Response({}),
+                                                iter(chunks)))
+        self.mox.ReplayAll()
+
+        user_iter = self.client.users.list(stream=True)
+        self.assertFalse(isinstance(user_iter, list))
+        user_list = list(user_iter)
+        [self.assertTrue(isinstance(u, users.User)) for u in user_list]
+        self.assertEqual([u.name for u in user_list], ['admin', 'demo'])
+
+    def test_find_by_name(self):
+        resp = httplib2.Response({
+            "status": 200,
+            "body": json.dumps({
+                "user": self.TEST_USERS['users']['values'][1],
+            }),
+            })
+        httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
+                              'v2.0/users?name=demo'),
+                              'GET',
+                              headers=self.TEST_REQUEST_HEADERS) \
+                              .AndReturn((resp, resp['body']))
+        self.mox.ReplayAll()
+
+        user = self.client.users.find(name='demo')
+        self.assertTrue(isinstance(user, users.User))
+        self.assertEqual(user.id, 2)
+
+    def test_find_by_name_unsupported(self):
+        resp = httplib2.Response({
+            "status": 200,
+            "body": json.dumps(self.TEST_USERS),
+            })
+        httplib2.Http.request(urlparse.urljoin(self.TEST_URL,
+                              'v2.0/users?name=demo'),
+                              'GET',
+                              headers=self.TEST_REQUEST_HEADERS) \
+                              .AndReturn((resp, resp['body']))
+        self.mox.ReplayAll()
+
+        user_list = self.client.users.findall(name='demo', enabled=True)
+        self.assertEqual([u.id for u in user_list], [2])
+
     def test_update(self):
         req_1 = {"user": {"password": "swordfish", "id": 2}}
         req_2 = {"user": {"id": 2, "email": "gabriel@example.com"}}
@@ -202,3 +296,78 @@ class UserTests(utils.TestCase):
         user = self.client.users.update_email(2, 'gabriel@example.com')
         user = self.client.users.update_tenant(2, 1)
         user = self.client.users.update_enabled(2, False)
+
+    def test_provision(self):
+        def create(name, password, email, tenant_id=None, enabled=True):
+            if name == "bad":
+                raise exceptions.Conflict(409)
+            return users.User(self.client.users, {"id": name + "-id",
+                                                  "name": name,
+                                                  "tenantId": tenant_id},
+                              loaded=True)
+        self.client.users.create = mock.Mock(side_effect=create)
+        self.client.roles.add_user_role = mock.Mock()
+        self.client.ec2.create = mock.Mock(return_value="creds")
+
+        specs = [{"name": "alice", "password": "pw", "email": "a@x",
+                  "tenant": "t1", "roles": ["r1", "r2"], "ec2": True},
+                 {"name": "bad", "password": "pw", "email": "b@x"},
+                 {"name": "carol", "password": "pw", "email": "c@x"}]
+        results = self.client.users.provision(iter(specs), max_workers=2)
+
+        alice, creds, error = results[0]
+        self.assertEqual((alice.id, creds, error), ("alice-id", "creds", None))
+        self.assertEqual(results[1][:2], (None, None))
+        self.assertTrue(isinstance(results[1][2], exceptions.Conflict))
+        self.assertEqual(results[2][0].id, "carol-id")
+        self.assertEqual(results[2][1:], (None, None))
+
+        self.client.users.create.assert_any_call("alice", "pw", "a@x", "t1",
+                                                 True)
+        self.assertEqual(
+            self.client.roles.add_user_role.call_args_list,
+            [((alice, "r1", "t1"), {}), ((alice, "r2", "t1"), {})])
+        self.client.ec2.create.assert_called_once_with("alice-id", "t1")
+
+    def test_entity_cache(self):
+        self.client.users.enable_entity_cache(ttl=60)
+        list_resp = httplib2.Response({
+            "status": 200,
+            "body": json.dumps(self.TEST_USERS),
+            })
+        update_req = {"user": {"id": 1, "email": "admin@example.com"}}
+        update_resp = httplib2.Response({
+            "status": 200,
+            "body": json.dumps(update_req),
+            })
+        user = dict(self.TEST_USERS['users']['values'][0],
+                    email="admin@example.com")
+        get_resp = httplib2.Response({
+            "status": 200,
+            "body": json.dumps({"user": user}),
+            })
+
+        httplib2.Http.request(urlparse.urljoin(self.TEST_URL, 'v2.0/users'),
+                              'GET',
+                              headers=self.TEST_REQUEST_HEADERS) \
+                              .AndReturn((list_resp, list_resp['body']))
+        httplib2.Http.request(urlparse.urljoin(self.TEST_URL, 'v2.0/users/1'),
+                              'PUT',
+                              body=json.dumps(update_req),
+                              headers=self.TEST_POST_HEADERS) \
+                              .AndReturn((update_resp, update_resp['body']))
+        httplib2.Http.request(urlparse.urljoin(self.TEST_URL, 'v2.0/users/1'),
+                              'GET',
+                              headers=self.TEST_REQUEST_HEADERS) \
+                              .AndReturn((get_resp, get_resp['body']))
+        self.mox.ReplayAll()
+
+        self.client.users.list()
+        # Served from the entries the list populated.
+        self.assertEqual(self.client.users.get(1).name, 'admin')
+        self.assertEqual(self.client.users.get('2').name, 'demo')
+
+        # An update drops the user, so the next get fetches it again.
+        self.client.users.update_email(1, "admin@example.com")
+        self.assertEqual(self.client.users.get(1).email, "admin@example.com")
+        self.assertEqual(self.client.users.get(1).email, "admin@example.com")